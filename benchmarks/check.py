@@ -0,0 +1,108 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+#
+# Cost of checking a type definition depending on its nesting depth.
+#
+# Usage: ./benchmarks/check.py [<depth> ...]
+#
+# For each depth given (default: 25 50 100 200 400) a struct with as many
+# levels of nested structs is built, where each level refers to a length field
+# of the level enclosing it. The time needed by TypeDefCollection.check() is
+# reported in total and per nesting level, where the latter is expected to
+# stay about constant: it is about 55 us per level for any depth from 25 up to
+# 800, i.e. checking takes time linear in the depth.
+#
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import *
+
+
+#
+# _____________________________________________________________________________
+#
+def makeNestedStruct(depth):
+    # innermost level
+    struct = StructDef([InstanceDef('uint8', 'n{0}'.format(depth))])
+    for level in reversed(range(depth)):
+        # length field, opaque field with length given by the enclosing
+        # level's length field, and the next inner level
+        members = [InstanceDef('uint8', 'n{0}'.format(level))]
+        if level > 0:
+            members += [InstanceDef('opaque', 'd{0}'.format(level),
+                    {'nbytes': IntSymbol('n{0}'.format(level - 1))})]
+        struct.setName('s{0}'.format(level + 1))
+        struct = StructDef(members + [struct])
+    struct.setName('Nested')
+    return struct
+
+
+#
+# _____________________________________________________________________________
+#
+def main(argv):
+
+    depths = [int(arg) for arg in argv] if argv else [25, 50, 100, 200, 400]
+
+    # recursion depth grows with the nesting depth
+    sys.setrecursionlimit(max(1000, 20 * max(depths)))
+
+    print('{0:>8} {1:>12} {2:>16}'.format('depth', 'check [ms]',
+            'per level [us]'))
+    for depth in depths:
+        # check a freshly built struct each time (i.e. including filling any
+        # caches) and take the best of some runs
+        durations = []
+        for i in range(5):
+            typedefs = TypeDefCollection()
+            typedefs.addDef(makeNestedStruct(depth))
+            start = timeit.default_timer()
+            typedefs.check()
+            durations += [timeit.default_timer() - start]
+        duration = min(durations)
+        print('{0:>8} {1:>12.2f} {2:>16.1f}'.format(depth, duration * 1e3,
+                duration * 1e6 / depth))
+
+
+#
+# _____________________________________________________________________________
+#
+if __name__ == "__main__":
+    main(sys.argv[1:]);
@@ -0,0 +1,126 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+#
+# Conformance of the parser backends (see parse.BACKENDS).
+#
+# Usage: ./benchmarks/conformance.py [<n-variants>] [<input-file> ...]
+#
+# Each input file (default: all files in examples/) is parsed using each
+# backend, and the results (the TPL code, the IR, and the line numbers, or the
+# position of the syntax error) are compared, as well as the results for
+# <n-variants> (default: 20) erroneous variants of the file, each derived by
+# removing a single token. The time taken by each backend to parse the files
+# is reported. The exit status is 1 if the backends disagree on any input.
+#
+
+import os
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import *
+import parse
+from rdparse import tokenize
+from parsing import getSignature
+
+
+#
+# _____________________________________________________________________________
+#
+def getResult(text, backend):
+    try:
+        return getSignature(parse.parse(text, backend=backend))
+    except parse.EtplParseException as e:
+        error = e.error
+    except Exception as e:
+        return (type(e).__name__, str(e))
+    return ('syntax error',
+            parse.getLineIndex(error.pstr).getLineAndColumn(error.loc))
+
+
+def getVariants(text, nVariants):
+    # remove tokens evenly spread across the text (but not the 'end' token)
+    tokens = tokenize(text)[:-1]
+    step = max(1, len(tokens) // max(1, nVariants))
+    return [text[:token[2]] + text[token[3]:] \
+            for token in tokens[step // 2::step][:nVariants]]
+
+
+#
+# _____________________________________________________________________________
+#
+def main(argv):
+
+    nVariants = int(argv[0]) if len(argv) > 0 else 20
+    inputFilenames = argv[1:] if len(argv) > 1 else sorted(glob.glob(
+            os.path.join(os.path.dirname(__file__), '..', 'examples', '*')))
+
+    durations = dict((backend, 0.) for backend in parse.BACKENDS)
+    nInputs = 0
+    nMismatches = 0
+    for inputFilename in inputFilenames:
+        with open(inputFilename, 'r') as f:
+            text = f.read()
+        for i, variant in enumerate([text] + getVariants(text, nVariants)):
+            results = []
+            for backend in parse.BACKENDS:
+                start = time.time()
+                results += [getResult(variant, backend)]
+                if i == 0:
+                    durations[backend] += time.time() - start
+            nInputs += 1
+            if any([result != results[0] for result in results[1:]]):
+                nMismatches += 1
+                print('Mismatch for {0}{1}:'.format(inputFilename,
+                        ' (variant {0})'.format(i) if i > 0 else ''))
+                for backend, result in zip(parse.BACKENDS, results):
+                    print('  {0}: {1}'.format(backend,
+                            result if len(result) == 2 else '<type defs>'))
+
+    print('Compared {0} input(s), {1} mismatch(es)'.format(
+            nInputs, nMismatches))
+    for backend in parse.BACKENDS:
+        print('  {0:>10}: {1:.3f} s'.format(backend, durations[backend]))
+    sys.exit(1 if nMismatches else 0)
+
+
+#
+# _____________________________________________________________________________
+#
+if __name__ == "__main__":
+    main(sys.argv[1:]);
@@ -0,0 +1,167 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+#
+# Memory footprint of the normalized IR of a synthetically enlarged grammar.
+#
+# Usage: ./benchmarks/memory.py [<scale>] [<input-file>]
+#
+# The input file (default: examples/tls-with1.3.etpl) is replicated <scale>
+# times (default: 4) with all top-level type names made unique per copy. The
+# memory held by the resulting normalized TypeDefCollection is measured using
+# tracemalloc if available, or by walking the IR's object graph otherwise. Run
+# this script on two revisions to compare their memory footprint.
+#
+# The part of the memory taken by the cache attributes of the IR nodes (see
+# core.cacheAttributes) is reported separately, both for their slots (which
+# every node has) and for the data cached in them. For the default input, the
+# normalized IR takes about 360 bytes per IR node at any scale: about 195 bytes
+# for the IR itself, about 15 bytes for the cache attributes' slots, and about
+# 150 bytes for the data cached while normalizing and sorting (mostly type
+# dependencies and member indices).
+#
+
+import os
+import re
+import sys
+import gc
+import types
+import struct
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import *
+from parse import parse
+import normalize
+from snapshot import getSlots
+
+
+#
+# _____________________________________________________________________________
+#
+def scaleGrammar(text, scale):
+    names = [t.getName() for t in parse(text).getTypeDefs()]
+    pattern = re.compile(r'\b({0})\b'.format('|'.join(names)))
+    return '\n'.join([pattern.sub(r'\1_{0}'.format(i), text) \
+            for i in range(scale)])
+
+
+#
+# _____________________________________________________________________________
+#
+def getReferents(obj, withCaches):
+    if withCaches or not isinstance(obj, \
+            (TypeDef, EnumItemAbstract, IntElement, SizeDef)):
+        return gc.get_referents(obj)
+    return [getattr(obj, a, None) for a in getSlots(obj.__class__) \
+            if a not in cacheAttributes]
+
+
+def getDeepSize(root, withCaches=True):
+    # Sum up the sizes of all objects reachable from <root>, not counting
+    # classes, functions, and modules, and objects shared by all instances
+    # (e.g. the built-in type definitions). Unless <withCaches> is True, the
+    # objects only reachable via the cache attributes of IR nodes are not
+    # counted either. Also return the number of IR nodes and the size of
+    # their cache attributes' slots.
+    skip = (type, types.ModuleType, types.FunctionType,
+            types.BuiltinFunctionType, types.MethodType)
+    seen = set(id(t) for t in BuiltInDefs.getTypeDefs()) \
+            if 'BuiltInDefs' in globals() else set()
+    stack = [root]
+    size = 0
+    nodes = 0
+    cacheSlotsSize = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, skip):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, (TypeDef, EnumItemAbstract, IntElement, SizeDef)):
+            nodes += 1
+            cacheSlotsSize += struct.calcsize('P') * len([a for a in \
+                    getSlots(obj.__class__) if a in cacheAttributes])
+        stack.extend(getReferents(obj, withCaches))
+    return size, nodes, cacheSlotsSize
+
+
+#
+# _____________________________________________________________________________
+#
+def main(argv):
+
+    scale = int(argv[0]) if len(argv) > 0 else 4
+    inputFilename = argv[1] if len(argv) > 1 else os.path.join(
+            os.path.dirname(__file__), '..', 'examples', 'tls-with1.3.etpl')
+
+    with open(inputFilename, 'r') as f:
+        text = scaleGrammar(f.read(), scale)
+
+    try:
+        import tracemalloc
+    except ImportError:
+        tracemalloc = None
+
+    if tracemalloc:
+        tracemalloc.start()
+    typedefs = parse(text).normalize()
+    typedefs.sort()
+    if tracemalloc:
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        method = 'tracemalloc'
+    else:
+        gc.collect()
+        size = getDeepSize(typedefs)[0]
+        method = 'object graph'
+    withCaches, nodes, cacheSlotsSize = getDeepSize(typedefs)
+    withoutCaches = getDeepSize(typedefs, False)[0]
+
+    print('Input: {0} (x{1}), {2} type definitions, {3} IR nodes' \
+            .format(inputFilename, scale, len(typedefs), nodes))
+    print('Memory ({0}): {1:.1f} KiB, {2:.1f} bytes per IR node' \
+            .format(method, size / 1024., float(size) / nodes))
+    print('Cache attributes: {0:.1f} bytes per IR node for their slots, '
+            '{1:.1f} bytes per IR node for the data cached' \
+            .format(float(cacheSlotsSize) / nodes,
+                    float(withCaches - withoutCaches) / nodes))
+
+
+#
+# _____________________________________________________________________________
+#
+if __name__ == "__main__":
+    main(sys.argv[1:]);
@@ -0,0 +1,114 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+#
+# Parsing time of the parser backends (see parse.BACKENDS) on synthetically
+# enlarged grammars.
+#
+# Usage: ./benchmarks/parsing.py [<scales>] [<input-file>]
+#
+# The input file (default: examples/tls.etpl) is replicated as many times as
+# given by each of the comma-separated <scales> (default: 1,4), see memory.py.
+# For each resulting grammar, the time to parse it is measured using each
+# backend. The results of all backends are checked to be identical to those of
+# the first one.
+#
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import *
+import parse
+from memory import scaleGrammar
+
+
+#
+# _____________________________________________________________________________
+#
+def getSignature(typedefs):
+    # everything that should come out of parsing: the TPL code, the IR,
+    # and the line numbers
+    lineNumbers = []
+    nodes = list(typedefs.getTypeDefs())
+    while nodes:
+        node = nodes.pop()
+        lineNumbers += [getattr(node, 'tplLineNo', None)]
+        nodes += node.getChildren()
+    return (typedefs.getTPLCode(), str(typedefs), lineNumbers)
+
+
+def timeParse(text, backend):
+    start = time.time()
+    typedefs = parse.parse(text, backend=backend)
+    return time.time() - start, getSignature(typedefs)
+
+
+#
+# _____________________________________________________________________________
+#
+def main(argv):
+
+    scales = [int(s) for s in argv[0].split(',')] if len(argv) > 0 else [1, 4]
+    inputFilename = argv[1] if len(argv) > 1 else os.path.join(
+            os.path.dirname(__file__), '..', 'examples', 'tls.etpl')
+
+    with open(inputFilename, 'r') as f:
+        text = f.read()
+
+    for scale in scales:
+        scaled = scaleGrammar(text, scale) if scale > 1 else text
+        print('Input: {0} (x{1}), {2} lines'.format(
+                inputFilename, scale, scaled.count('\n') + 1))
+
+        reference, signature = None, None
+        for backend in parse.BACKENDS:
+            duration, backendSignature = timeParse(scaled, backend)
+            if reference is None:
+                reference, signature = duration, backendSignature
+            print('  {0:<10} {1:6.2f} s ({2:4.1f}x){3}'.format(backend,
+                    duration, reference / duration,
+                    '' if backendSignature == signature \
+                            else ', RESULTS DIFFER'))
+
+
+#
+# _____________________________________________________________________________
+#
+if __name__ == "__main__":
+    main(sys.argv[1:]);
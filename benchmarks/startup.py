@@ -0,0 +1,150 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+#
+# Start-up time of etpl-tool.py when (almost) nothing needs to be compiled.
+#
+# Usage: ./benchmarks/startup.py [<runs>] [<input-file>]
+#
+# The input file (default: examples/tls.etpl) is compiled once to fill a
+# compile cache and to write a snapshot of its type definitions. Then the time
+# taken by etpl-tool.py (as a separate process, best of <runs> runs, default:
+# 10) is measured for taking all results from the cache, for generating
+# different outputs from the snapshot, and for parsing the input file using
+# either parser backend. For each case, the tool's modules (and
+# pyparsing) having been loaded are reported.
+#
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+
+toolPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+        'etpl-tool.py')
+
+# The modules loaded on demand
+modules = ['pyparsing', 'parse', 'rdparse', 'pypgrammar', 'normalize',
+        'dedup', 'generate_cpp', 'features']
+
+# Run etpl-tool.py and report the modules loaded (to stderr)
+runner = '''
+import sys, runpy
+sys.argv = {0!r}
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+finally:
+    sys.stderr.write(' '.join([m for m in {1!r} if m in sys.modules]))
+'''
+
+
+#
+# _____________________________________________________________________________
+#
+def runTool(args, runs):
+    best = None
+    for i in range(runs):
+        start = time.time()
+        process = subprocess.Popen([sys.executable, '-c',
+                runner.format([toolPath] + args, modules)],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        loaded = process.communicate()[1].strip().split('\n')[-1]
+        duration = time.time() - start
+        if process.returncode != 0:
+            raise Exception('etpl-tool.py failed: {0}'.format(' '.join(args)))
+        best = duration if best is None else min(best, duration)
+    return best, loaded
+
+
+def timeInterpreter():
+    start = time.time()
+    subprocess.check_call([sys.executable, '-c', 'pass'])
+    return time.time() - start
+
+
+#
+# _____________________________________________________________________________
+#
+def main(argv):
+
+    runs = int(argv[0]) if len(argv) > 0 else 10
+    inputFilename = os.path.abspath(argv[1] if len(argv) > 1 else
+            os.path.join(os.path.dirname(__file__), '..', 'examples',
+                    'tls.etpl'))
+
+    tmpDir = tempfile.mkdtemp()
+    try:
+        cacheDir = os.path.join(tmpDir, 'cache')
+        snapshot = os.path.join(tmpDir, 'snapshot')
+        out = lambda name: os.path.join(tmpDir, name)
+
+        # compile once to fill the cache and to write the snapshot
+        cached = ['-c' + cacheDir, '-s' + snapshot, '-p' + out('parser.cpp'),
+                '-bTLSRecord', inputFilename]
+        runTool(cached, 1)
+
+        cases = [
+            ('Python interpreter only', None),
+            ('All results from cache', cached),
+            ('Snapshot -> snapshot', ['-s' + out('copy'), snapshot]),
+            ('Snapshot -> C++ parser', ['-p' + out('parser.cpp'), snapshot]),
+            ('Snapshot -> feature list', ['-bTLSRecord',
+                    '-f' + out('features.txt'), snapshot]),
+            ('Parse (rd) -> snapshot', ['-Brd', '-s' + out('copy'),
+                    inputFilename]),
+            ('Parse (pyparsing) -> snapshot', ['-Bpyparsing',
+                    '-s' + out('copy'), inputFilename])
+        ]
+        print('{0:<30} {1:>10}  {2}'.format('', 'time [ms]', 'loaded'))
+        for name, args in cases:
+            if args is None:
+                duration, loaded = min([timeInterpreter() \
+                        for i in range(runs)]), ''
+            else:
+                duration, loaded = runTool(args, runs)
+            print('{0:<30} {1:>10.1f}  {2}'.format(name, duration * 1e3,
+                    loaded))
+    finally:
+        shutil.rmtree(tmpDir)
+
+
+#
+# _____________________________________________________________________________
+#
+if __name__ == "__main__":
+    main(sys.argv[1:]);
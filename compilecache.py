@@ -0,0 +1,144 @@
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+#
+# On-disk cache of etpl-tool results. Each cache entry is a directory named by
+# a hash of everything the results depend on: the input text, the options
+# affecting processing, and the tool's own source code. An entry holds any
+# number of named artifacts (e.g. generated source code or an IR snapshot).
+# As artifacts end up in generated code, cache directories and artifacts not
+# owned by the current user (or writable by others) are refused.
+#
+
+import os
+import stat
+import hashlib
+import tempfile
+from core import TPLError
+
+
+# Modules whose source code the results of etpl-tool depend on
+toolModules = ['etpl-tool.py', 'core.py', 'parse.py', 'pypgrammar.py',
+        'rdparse.py', 'normalize.py', 'dedup.py', 'passes.py', 'snapshot.py',
+        'generate_cpp.py', 'features.py']
+
+
+#
+# _____________________________________________________________________________
+#
+
+def getToolVersion():
+    """ Return a hash of the tool's source code """
+    toolDir = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha1()
+    for name in toolModules:
+        with open(os.path.join(toolDir, name), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def isTrusted(path):
+    """ Return True if <path> is owned by the current user and not writable
+    by anyone else """
+    if not hasattr(os, 'getuid'):
+        return True
+    return isTrustedStat(os.stat(path))
+
+
+def isTrustedStat(st):
+    if not hasattr(os, 'getuid'):
+        return True
+    return st.st_uid == os.getuid() and \
+            not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+class CompileCache(object):
+
+    def __init__(self, directory, text, options):
+        """ Open the entry of cache <directory> for processing <text> with
+        the given <options> (a dictionary of strings) """
+        h = hashlib.sha256()
+        h.update(getToolVersion())
+        for key, value in sorted(options.iteritems()):
+            h.update('\0{0}={1}'.format(key, value))
+        h.update('\0')
+        h.update(text)
+        self.key = h.hexdigest()
+        self.baseDirectory = directory
+        self.directory = os.path.join(directory, self.key)
+        for path in [self.baseDirectory, self.directory]:
+            if os.path.exists(path) and not isTrusted(path):
+                raise TPLError('Refusing to use cache directory "{0}" which '
+                        'is not owned by the current user or writable by '
+                        'others'.format(path))
+
+    def getKey(self):
+        return self.key
+
+    def getPath(self, name, shared=False):
+        """ Return the path of artifact <name>, which is either specific to
+        this cache entry or <shared> among all entries """
+        directory = self.baseDirectory if shared else self.directory
+        return os.path.join(directory, name)
+
+    def has(self, name, shared=False):
+        path = self.getPath(name, shared)
+        return os.path.isfile(path) and isTrusted(path)
+
+    def load(self, name, shared=False):
+        """ Return the artifact <name> or None if it is not cached """
+        try:
+            with open(self.getPath(name, shared), 'rb') as f:
+                if not isTrustedStat(os.fstat(f.fileno())):
+                    return None
+                return f.read()
+        except IOError:
+            return None
+
+    def store(self, name, data, shared=False):
+        """ Add the artifact <name> to the cache """
+        directory = os.path.dirname(self.getPath(name, shared))
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory, 0700)
+            except OSError:
+                # the directory might have been created concurrently
+                if not os.path.isdir(directory):
+                    raise
+        # write to a temporary file first such that concurrent runs never
+        # see partially written artifacts
+        fd, tmpName = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmpName, self.getPath(name, shared))
@@ -60,12 +60,28 @@
 import math
 from collections import Set
 import itertools
+import heapq
+import bisect
 
 # TODO: let a Select-Case construct support collective names/characteristics
 
 # TODO: introduce a 'void' built-in type
 
 
+# Attributes of IR nodes caching data derived from other attributes. They are
+# (re)computed on demand whenever set to None.
+cacheAttributes = frozenset([
+    'requiredSymbols', 'typeDependencies', 'pathFromRoot', 'chainedNames',
+    'childNames', 'memberIndex', 'selectIndices', 'itemIndex', 'codeIndex',
+    'caseIndex', 'instantiation', 'instantiationTableEpoch'
+])
+
+# Attributes of IR nodes set by code generators
+generatorAttributes = frozenset([
+    'cppClassName', 'cppClassArgs', 'cppClassArgDefaults', 'cppClassSymbols'
+])
+
+
 def sumDicts(dict1, dict2):
     for key in dict2:
         dict1[key] = dict1.get(key, 0) + dict2.get(key)
@@ -144,6 +160,8 @@ class TextFormatter(object):
 
 
 def getUniqueName(names, proposal):
+    if isinstance(names, NameSet):
+        return names.getUniqueName(proposal)
     name = proposal
     proposals = ('{0}_{1}'.format(proposal, i) for i in itertools.count(2))
     while name in names:
@@ -151,6 +169,53 @@ def getUniqueName(names, proposal):
     return name
 
 
+class NameSet(object):
+    """
+    Multiset of the names of a container's children. To find unique names it
+    keeps, for each proposed name <p>, the suffix <n> such that all the names
+    "<p>_2" up to "<p>_<n-1>" are known to be taken.
+    """
+
+    __slots__ = ('counts', 'nextSuffix')
+
+    def __init__(self, names=None):
+        self.counts = {}
+        self.nextSuffix = {}
+        if names:
+            for name in names:
+                self.add(name)
+
+    def __contains__(self, name):
+        return name in self.counts
+
+    def add(self, name):
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def remove(self, name):
+        count = self.counts.get(name, 0)
+        if count > 1:
+            self.counts[name] = count - 1
+        elif count == 1:
+            del self.counts[name]
+            if isinstance(name, str):
+                # "<p>_<n>" might be available again
+                prefix, delim, suffix = name.rpartition('_')
+                if delim and suffix.isdigit() and \
+                        int(suffix) < self.nextSuffix.get(prefix, 0):
+                    self.nextSuffix[prefix] = int(suffix)
+
+    def getUniqueName(self, proposal):
+        if proposal not in self.counts:
+            return proposal
+        i = self.nextSuffix.get(proposal, 2)
+        name = '{0}_{1}'.format(proposal, i)
+        while name in self.counts:
+            i += 1
+            name = '{0}_{1}'.format(proposal, i)
+        self.nextSuffix[proposal] = i
+        return name
+
+
 class TPLError(Exception):
     """
     Representation of a generic TPL error
@@ -171,6 +236,8 @@ class TPLCheckError(Exception):
 
 class SizeDef(object):
 
+    __slots__ = ('size', 'bitScale')
+
     def __init__(self, size, bitScale=8):
         self.setSize(size)
         self.setBitScale(bitScale)
@@ -198,12 +265,16 @@ class SizeDef(object):
 
 class IntElement(object):
 
+    __slots__ = ()
+
     def getRequiredSymbols(self):
         return set()
 
 
 class IntLiteral(IntElement):
 
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -245,6 +316,8 @@ class IntLiteral(IntElement):
 
 class IntSymbol(IntElement):
 
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -263,12 +336,10 @@ class TypeDefCollection(object):
     # TODO: Add iterator capability to this class
 
     def __init__(self, globalSymbols=None):
+        self.scopeTable = None
+        self.childNames = None
         self.clear()
         self.globalSymbols = globalSymbols if globalSymbols else set()
-        # add built-in type definitions
-        self.addDefs([UIntDef(i) for i in range(1, 65)])
-        self.addDefs([SIntDef(i) for i in range(1, 65)])
-        self.addDefs([BitDef(), ByteDef(), OpaqueDef()])
 
     def __str__(self):
         return self.getPrintString()
@@ -280,16 +351,18 @@ class TypeDefCollection(object):
         if isinstance(index, int):
             return self.typedefs[index]
         elif isinstance(index, str):
-            itemIter = (t for t in self.getTypeDefs() if t.getName() == index)
-            try:
-                return itemIter.next()
-            except StopIteration:
+            typedef = self.typedefsByName.get(index)
+            if typedef is None:
+                # built-in type definitions are shared among collections
+                typedef = BuiltInDefs.get(index)
+            if typedef is None:
                 raise TPLError('Unknown type definition "{0}"'.format(index))
+            return typedef
         else:
             raise TPLError('Unknown index type')
 
     def __len__(self):
-        return len(self.getTypeDefs())
+        return len(self.typedefs)
 
     def getName(self, default=None):
         return '_GLOBAL'
@@ -299,47 +372,98 @@ class TypeDefCollection(object):
 
     def clear(self):
         self.typedefs = []
+        # index of type definitions by name (kept in sync with self.typedefs)
+        self.typedefsByName = {}
+        self.childNames = None
+        self.invalidateScope()
+        TypeDef.invalidateInstantiations()
 
     def addDef(self, typedef, autoUpdateName=False):
         if autoUpdateName:
             typedef.setName(typedef.getName())
-        if typedef.getName() in self.getTypeNames():
+        if self.hasTypeName(typedef.getName()):
             err = 'Element "{0}" already exists.'.format(typedef.getName())
             raise Exception(err)
         if not typedef.getName():
             raise Exception('Element has empty name')
         self.typedefs += [typedef]
+        self.typedefsByName[typedef.getName()] = typedef
+        if self.childNames is not None:
+            self.childNames.add(typedef.name)
+        if isinstance(typedef, ConstDef):
+            self.invalidateScope()
         typedef.setParent(self)
 
     def addDefs(self, typedefs):
         for typedef in typedefs:
             self.addDef(typedef)
 
-    def getTypeDefs(self, includeBuiltIn=True):
+    def getTypeDefs(self, includeBuiltIn=False):
         if includeBuiltIn:
-            return self.typedefs
+            return list(BuiltInDefs.getTypeDefs()) + self.typedefs
         else:
-            return [t for t in self.typedefs if not isinstance(t, BuiltInDef)]
+            return self.typedefs
 
     def getChildren(self):
         return self.getTypeDefs()
 
+    def getChildNames(self):
+        if self.childNames is None:
+            self.childNames = NameSet([t.name for t in self.getChildren()])
+        return self.childNames
+
+    def childRenamed(self, child, oldName):
+        if self.typedefsByName.get(oldName) is child:
+            del self.typedefsByName[oldName]
+        if child.name is not None:
+            self.typedefsByName.setdefault(child.name, child)
+        if isinstance(child, ConstDef):
+            self.invalidateScope()
+
     def getTypeNames(self):
         return [t.getName() for t in self.getTypeDefs()]
 
+    def hasTypeName(self, name):
+        return name in self.typedefsByName or BuiltInDefs.has(name)
+
     def addGlobalSymbol(self, name):
         self.globalSymbols.update(set([name]))
+        self.invalidateScope()
 
     def getGlobalSymbols(self):
         return self.globalSymbols
 
+    def getScope(self):
+        """ Return the (cached) table of global symbols, which consists of
+        all the global symbols we know and all constant integer expressions
+        (see TypeDef.getScope()) """
+        if self.scopeTable is None:
+            scope = {var: (self, None) for var in self.getGlobalSymbols()}
+            scope.update({const.getName(): (self, None)
+                    for const in self.getTypeDefs()
+                    if isinstance(const, ConstDef)})
+            self.scopeTable = scope
+        return self.scopeTable
+
+    def invalidateScope(self):
+        """ Called when the global symbols or constants have changed """
+        self.scopeTable = None
+
+    def resolveInstantiations(self):
+        """ Annotate all instantiations with the (non-alias) type definition
+        they finally refer to. Aliases are resolved before the definitions
+        referring to them if the collection is sorted """
+        nodes = list(reversed(self.getTypeDefs()))
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, InstanceDef):
+                node.followInstantiation()
+            nodes.extend(node.getChildren())
+
     def getKnownSymbols(self, ref=None):
-        # we can safely ignore argument 'ref' here and just return all the
-        # global symbols we known and all constant integer expressions
-        symbols = {var: self for var in self.getGlobalSymbols()}
-        symbols.update({const.getName(): self for const in self.getTypeDefs()
-                if isinstance(const, ConstDef)})
-        return symbols
+        # we can safely ignore argument 'ref' here
+        return {var: where for var, (where, index)
+                in self.getScope().iteritems()}
 
     def getUndefinedSymbols(self):
         s = set()
@@ -354,9 +478,45 @@ class TypeDefCollection(object):
             s.update(t.dependsOnTypes())
         return s
 
+    def getReachableTypeNames(self, roots):
+        """ Return the set of names of the type definitions that the type
+        definitions named in <roots> (transitively) depend on, including the
+        roots themselves """
+        reachable = set()
+        pending = list(roots)
+        while pending:
+            name = pending.pop()
+            if name in reachable:
+                continue
+            reachable.add(name)
+            typedef = self.typedefsByName.get(name)
+            if typedef is not None:
+                pending.extend(typedef.dependsOnTypes())
+                # constant integers are referred to as symbols
+                pending.extend(var for var in typedef.getRequiredSymbols() \
+                        if isinstance(self.typedefsByName.get(var), ConstDef))
+        return reachable
+
+    def removeUnreachable(self, roots):
+        """ Remove all type definitions that are not reachable from the type
+        definitions named in <roots>. Return the number of removed type
+        definitions """
+        unknown = [name for name in roots if not self.hasTypeName(name)]
+        if unknown:
+            raise TPLError('Unknown type definition "{0}"'.format(unknown[0]))
+        reachable = self.getReachableTypeNames(roots)
+        typedefs = [t for t in self.getTypeDefs() if t.getName() in reachable]
+        nRemoved = len(self.typedefs) - len(typedefs)
+        if nRemoved:
+            self.clear()
+            self.addDefs(typedefs)
+        return nRemoved
+
     def generateTypeIDs(self):
+        # type IDs following 100 are reserved for built-in types
+        offset = 100 + len(BuiltInDefs.getTypeDefs())
         for i, t in enumerate(self.getTypeDefs()):
-            t.setTypeID(100 + i)
+            t.setTypeID(offset + i)
 
     def check(self):
         # TODO: return a list of warnings with function check
@@ -365,26 +525,63 @@ class TypeDefCollection(object):
 
     def sort(self):
 
-        def sufficient(typedef, typedefs):
-            known = typedefs.getTypeNames()
-            if typedef.getName() in known:
-                return False
-            if not typedef.dependsOnTypes().issubset(set(known)):
-                return False
-            return True
+        pool = self.getTypeDefs()
+
+        # built-in types are always known and do not need to be considered
+        deps = [t.dependsOnTypes().difference(BuiltInDefs.getTypeNames())
+                for t in pool]
 
         # find unknown types referred to by type definitions
-        unknown = self.dependsOnTypes()
-        unknown.difference_update(self.getTypeNames())
+        unknown = set().union(*deps)
+        unknown.difference_update(self.typedefsByName)
         if len(unknown):
             raise TPLError('Unknown type "{0}"'.format(iter(unknown).next()))
 
-        # sort type definitions such that no definition
-        # appears before all the definitions it refers to
-        pool = self.getTypeDefs()
+        # build the dependency graph on indices into the pool: for each type
+        # definition count the definitions it still waits for and list the
+        # definitions waiting for it
+        index = {t.getName(): i for i, t in enumerate(pool)}
+        nPending = [len(d) for d in deps]
+        dependents = [[] for t in pool]
+        for i, names in enumerate(deps):
+            for name in names:
+                dependents[index[name]].append(i)
+
+        # sort type definitions such that no definition appears before all the
+        # definitions it refers to (Kahn's algorithm). Among the definitions
+        # ready to be placed, always pick the one appearing first in the
+        # original order to keep the result deterministic.
+        ready = [i for i in range(len(pool)) if nPending[i] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            i = heapq.heappop(ready)
+            order += [i]
+            for j in dependents[i]:
+                nPending[j] -= 1
+                if nPending[j] == 0:
+                    heapq.heappush(ready, j)
+
+        if len(order) < len(pool):
+            # Every definition left over waits for at least one other left
+            # over definition, so following such references must run into a
+            # cycle eventually
+            remaining = set(range(len(pool))).difference(order)
+            i = min(remaining)
+            path = []
+            visited = {}
+            while i not in visited:
+                visited[i] = len(path)
+                path += [i]
+                i = min(index[name] for name in deps[i]
+                        if index[name] in remaining)
+            cycle = path[visited[i]:] + [i]
+            raise TPLError('Cyclic dependency between type definitions: {0}' \
+                    .format(' -> '.join(['"{0}"'.format(pool[j].getName())
+                            for j in cycle])))
+
         self.clear()
-        while len(self) < len(pool):
-            self.addDef((t for t in pool if sufficient(t, self)).next())
+        self.addDefs([pool[i] for i in order])
 
     def countReferences(self):
         refs = {}
@@ -393,16 +590,38 @@ class TypeDefCollection(object):
         return refs
 
     def getTPLCode(self):
-        return '\n\n'.join([t.getTPLCode() for t in self.getTypeDefs(False)])    
+        return '\n\n'.join([t.getTPLCode() for t in self.getTypeDefs()])
 
 
 class TypeDef(object):
 
+    # Type definitions make up the nodes of the IR, which for large grammars
+    # may count hundreds of thousands of instances. Avoid per-instance dicts.
+    __slots__ = (
+        'parent', 'name', 'paramList', 'flags', 'size', 'typeID', 'bindings',
+        'tplLineNo', 'checks', 'requiredSymbols', 'typeDependencies',
+        'pathFromRoot', 'chainedNames', 'childNames',
+        # attributes set by code generators
+        'cppClassName', 'cppClassArgs', 'cppClassArgDefaults',
+        'cppClassSymbols')
+
     flagExtern = 'extern'
     flagOptional = 'optional'
     flagDistinctive = 'distinctive'
     flagNames = [flagExtern, flagOptional, flagDistinctive]
 
+    # flags are stored as a bit mask
+    flagBits = {flagExtern: 1, flagOptional: 2, flagDistinctive: 4}
+
+    # The resolved instantiations cached by InstanceDefs are invalidated
+    # altogether by incrementing this counter whenever the structure of any
+    # tree or any instantiation changes
+    instantiationEpoch = 0
+
+    @staticmethod
+    def invalidateInstantiations():
+        TypeDef.instantiationEpoch += 1
+
     @staticmethod
     def getNDigits(number, base):
         return (i for i in itertools.count() if (base**i) > number).next()   
@@ -431,13 +650,19 @@ class TypeDef(object):
         return '@'.join(list2[-2:-1] + ([path] if path else []))
 
     def __init__(self):
+        self.requiredSymbols = None
+        self.typeDependencies = None
+        self.pathFromRoot = None
+        self.chainedNames = None
+        self.childNames = None
+        self.name = None
         self.setParent(None)
         self.setName(None)
-        self.paramList = []
+        self.paramList = ()
         self.resetFlags()
         self.resetSize()
         self.resetTypeID()
-        self.bindings = {}
+        self.bindings = None
 
     def __str__(self):
         typeStr = '+' if self.isReal() else '-'
@@ -458,8 +683,8 @@ class TypeDef(object):
         string = '{0}{1}: {2}{3}'.format(typeStr, sizeStr, nameStr, paramStr)
 
         # add bindings
-        if len(self.bindings):
-            string += ' -> ' + TextFormatter.makeBoldYellow(', '.join(map(str, self.bindings.values())))
+        if len(self.getBindings()):
+            string += ' -> ' + TextFormatter.makeBoldYellow(', '.join(map(str, self.getBindings().values())))
 
         # add type ID
         #if self.getTypeID():
@@ -493,6 +718,7 @@ class TypeDef(object):
 
     def setSize(self, size):
         self.size = size
+        self.invalidateSummaries()
 
     def getSizeStr(self):
         return '({0})'.format(str(self.getSize())) if self.getSize() else None
@@ -501,13 +727,20 @@ class TypeDef(object):
         self.setSize(None)
 
     def resetFlags(self):
-        self.flags = {flag: False for flag in TypeDef.flagNames}
+        self.flags = 0
 
     def setFlags(self, flags):
+        if isinstance(flags, dict):
+            # flags given as a dictionary of flag names and states
+            flags = sum([TypeDef.flagBits[flag]
+                    for flag, state in flags.iteritems() if state])
         self.flags = flags
 
     def setFlag(self, flag, state=True):
-        self.flags[flag] = state
+        if state:
+            self.flags |= TypeDef.flagBits[flag]
+        else:
+            self.flags &= ~TypeDef.flagBits[flag]
 
     def setFlagExtern(self, state=True):
         self.setFlag(TypeDef.flagExtern, state)
@@ -522,7 +755,7 @@ class TypeDef(object):
         return self.flags
 
     def getFlag(self, flag):
-        return self.getFlags()[flag]
+        return (self.flags & TypeDef.flagBits[flag]) != 0
 
     def getFlagExtern(self):
         return self.getFlag(TypeDef.flagExtern)
@@ -548,6 +781,10 @@ class TypeDef(object):
 
     def setParent(self, parent):
         self.parent = parent
+        TypeDef.invalidateInstantiations()
+        self.invalidatePaths()
+        if isinstance(parent, TypeDef):
+            parent.invalidateSummaries()
 
     def getTypeDefCollection(self):
         parent = self.getParent()
@@ -564,13 +801,25 @@ class TypeDef(object):
 
     def addParameter(self, param):
         if not param in self.paramList:
-            self.paramList += [param]
+            self.paramList += (param,)
+            TypeDef.invalidateInstantiations()
+            self.invalidateSummaries()
         else:
             TPLError('Parameter "{0}" already exists in definition of "{1}"' \
                     .format(param, self.getName()))
 
     def addParameters(self, params):
-        self.paramList += params
+        self.paramList += tuple(params)
+        TypeDef.invalidateInstantiations()
+        self.invalidateSummaries()
+
+    def getBindings(self):
+        return self.bindings if self.bindings is not None else {}
+
+    def setBinding(self, key, symbol):
+        if self.bindings is None:
+            self.bindings = {}
+        self.bindings[key] = symbol
 
     def getContentStr(self):
         return None
@@ -579,26 +828,60 @@ class TypeDef(object):
         return self.name if self.name else default
 
     def getPathFromRoot(self):
-        parent = self.getParent()
-        if isinstance(parent, TypeDef):
-            return parent.getPathFromRoot() + [self]
-        else:
-            return [parent, self]
+        if self.pathFromRoot is None:
+            parent = self.getParent()
+            if isinstance(parent, TypeDef):
+                parent.getPathFromRoot()
+                self.pathFromRoot = parent.pathFromRoot + (self,)
+            else:
+                self.pathFromRoot = (parent, self)
+        return list(self.pathFromRoot)
 
     def getChainedName(self, delim='_'):
-        pathFromRoot = self.getPathFromRoot()
-        # exclude Root (TypeDefCollection) here
-        return delim.join([t.getName('~') for t in pathFromRoot[1:]])
+        if self.chainedNames is None:
+            self.chainedNames = {}
+        name = self.chainedNames.get(delim)
+        if name is None:
+            parent = self.getParent()
+            # exclude Root (TypeDefCollection) here
+            if isinstance(parent, TypeDef):
+                name = parent.getChainedName(delim) + delim + self.getName('~')
+            else:
+                name = self.getName('~')
+            self.chainedNames[delim] = name
+        return name
+
+    def invalidatePaths(self):
+        # Drop cached paths from root and chained names of this type
+        # definition and all its descendants. Descendants can only have them
+        # cached if their ancestors have, so stop at nodes without any.
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            if node.pathFromRoot is not None or node.chainedNames is not None:
+                node.pathFromRoot = None
+                node.chainedNames = None
+                nodes.extend(node.getChildren())
 
     def setName(self, name):
+        parent = self.getParent()
+        oldName = self.name
         if not name:
             self.name = None
+        elif parent is not None:
+            self.name = parent.getChildNames().getUniqueName(name)
         else:
-            if self.getParent():
-                names = [t.name for t in self.getParent().getChildren()]
-            else:
-                names = []
-            self.name = getUniqueName(names, name)
+            self.name = name
+        if parent is not None:
+            if parent.childNames is not None:
+                parent.childNames.remove(oldName)
+                parent.childNames.add(self.name)
+            if oldName != self.name:
+                parent.childRenamed(self, oldName)
+        TypeDef.invalidateInstantiations()
+        self.invalidatePaths()
+        # the enclosing struct's required symbols depend on its member names
+        self.invalidateSummaries()
         return self.name
 
     def resetTypeID(self):
@@ -613,21 +896,104 @@ class TypeDef(object):
     def getChildren(self):
         return []
 
-    def getKnownSymbols(self, ref=None):
-        knownSymbols = {}
-        if self.getParent():
-            knownSymbols = self.getParent().getKnownSymbols(self)
-        knownSymbols.update({var: self for var in self.getParamList()})
-        return knownSymbols
+    def getChildNames(self):
+        """ Return the (cached) multiset of names of this type definition's
+        children """
+        if self.childNames is None:
+            self.childNames = NameSet([c.name for c in self.getChildren()])
+        return self.childNames
+
+    def childRenamed(self, child, oldName):
+        """ Called when the name of one of this type definition's children
+        has changed from <oldName> """
+        pass
+
+    def replaceChildName(self, oldChild, newChild):
+        if self.childNames is not None:
+            if oldChild is not None:
+                self.childNames.remove(oldChild.name)
+            if newChild is not None:
+                self.childNames.add(newChild.name)
+
+    def lookUpSymbol(self, var):
+        """ Return a tuple of the node defining symbol <var> as known to this
+        type definition and, for struct members, the index of the member, or
+        None if the symbol is unknown """
+        # walk up the tree: each node knows its own parameters and, for its
+        # children, the symbols it defines for them (see lookUpLocalSymbol())
+        node, child = self, None
+        while isinstance(node, TypeDef):
+            where = node.lookUpLocalSymbol(var, child)
+            if where is not None:
+                return where
+            node, child = node.getParent(), node
+        return node.getScope().get(var) if node is not None else None
+
+    def lookUpLocalSymbol(self, var, child=None):
+        """ Return a tuple of this type definition and the member index (see
+        lookUpSymbol()) if this type definition defines symbol <var> for its
+        child <child> (or itself if <child> is None), or None otherwise """
+        return (self, None) if var in self.paramList else None
+
+    def addLocalSymbols(self, scope, child=None):
+        """ Add the symbols this type definition defines for its child
+        <child> (or itself if <child> is None) to the table <scope> """
+        scope.update({var: (self, None) for var in self.paramList})
+
+    def getScope(self):
+        """ Return the table of symbols known to this type definition,
+        mapping each symbol to a tuple as returned by lookUpSymbol(). The
+        table is built on each call, so use lookUpSymbol() to look up
+        individual symbols """
+        path = [None]
+        node = self
+        while isinstance(node, TypeDef):
+            path += [node]
+            node = node.getParent()
+        scope = dict(node.getScope()) if node is not None else {}
+        # from the top-level type definition down to this one
+        for i in xrange(len(path) - 1, 0, -1):
+            path[i].addLocalSymbols(scope, path[i - 1])
+        return scope
+
+    def getKnownSymbols(self):
+        return {var: where for var, (where, index)
+                in self.getScope().iteritems()}
 
     def getRequiredSymbols(self):
+        """ Return the (cached) set of symbols this type definition refers
+        to without defining them itself """
+        if self.requiredSymbols is None:
+            self.requiredSymbols = frozenset(self.computeRequiredSymbols())
+        return self.requiredSymbols
+
+    def dependsOnTypes(self):
+        """ Return the (cached) set of names of type definitions this type
+        definition refers to """
+        if self.typeDependencies is None:
+            self.typeDependencies = frozenset(self.computeDependsOnTypes())
+        return self.typeDependencies
+
+    def invalidateSummaries(self):
+        # Drop cached symbol and type dependencies of this type definition
+        # and all its ancestors. Computing a node's summary computes the
+        # summaries of all its descendants, so once we reach a node without
+        # a summary all nodes further up don't have one either.
+        node = self
+        while isinstance(node, TypeDef) and (node.requiredSymbols is not None
+                or node.typeDependencies is not None):
+            node.requiredSymbols = None
+            node.typeDependencies = None
+            node = node.getParent()
+
+    def computeRequiredSymbols(self):
         s = set()
         size = self.getSize()
         if size and isinstance(size.getSize(), IntSymbol):
             s.update(set([size.getSize().getName()]))
         return s
 
-    def dependsOnTypes(self):
+    def computeDependsOnTypes(self):
         return set()
 
     def check(self):
@@ -645,8 +1011,8 @@ class TypeDef(object):
             child.check()
 
         # run variable dependence check
-        requiredSymbols = self.getRequiredSymbols()
-        requiredSymbols.difference_update(set(self.getKnownSymbols().keys()))
+        requiredSymbols = [var for var in self.getRequiredSymbols() \
+                if self.lookUpSymbol(var) is None]
         if requiredSymbols:
             first = (v for v in requiredSymbols).next()
             raise TPLCheckError(
@@ -660,11 +1026,13 @@ class TypeDef(object):
 
         # find variable references that will be broken by making this TypeDef
         # an instantiation of a global TypeDef
-        requiredVar = self.getRequiredSymbols()
-        knownSymbols = self.getKnownSymbols()
         globalScope = self.getTypeDefCollection()
-        brokenRefs = [var for var, where in knownSymbols.iteritems()
-                if var in requiredVar and where is not globalScope]
+        brokenRefs = [var for var in self.getRequiredSymbols()
+                if (self.lookUpSymbol(var) or (globalScope,))[0] \
+                        is not globalScope]
+        if len(brokenRefs) > 1:
+            # keep the order in which the parameters have always been added
+            brokenRefs = [var for var in self.getScope() if var in brokenRefs]
         fieldArgs = {var: IntSymbol(var) for var in brokenRefs}
 
         name = self.getName()
@@ -727,6 +1095,8 @@ class BuiltInDef(TypeDef):
     Representation of built-in types (e.g. integers, bits, bytes, etc.)
     """
 
+    __slots__ = ()
+
     def __init__(self, name=None):
         TypeDef.__init__(self)
         self.setName(name)
@@ -750,6 +1120,8 @@ class IntDef(BuiltInDef):
     Representation of integers
     """
 
+    __slots__ = ('width',)
+
     def __init__(self, width, signed):
         form = 'sint{0}' if signed else 'uint{0}'
         BuiltInDef.__init__(self, form.format(width))
@@ -771,6 +1143,8 @@ class UIntDef(IntDef):
     Representation of unsigned integers
     """
 
+    __slots__ = ()
+
     def __init__(self, width):
         IntDef.__init__(self, width, False)
 
@@ -780,6 +1154,8 @@ class SIntDef(IntDef):
     Representation of signed integers
     """
 
+    __slots__ = ()
+
     def __init__(self, width):
         IntDef.__init__(self, width, True)
 
@@ -789,6 +1165,8 @@ class BitDef(BuiltInDef):
     Representation of a single bit
     """
 
+    __slots__ = ()
+
     def __init__(self):
         BuiltInDef.__init__(self, 'bit')
 
@@ -804,6 +1182,8 @@ class ByteDef(BuiltInDef):
     Representation of a single byte
     """
 
+    __slots__ = ()
+
     def __init__(self):
         BuiltInDef.__init__(self, 'byte')
 
@@ -819,6 +1199,8 @@ class OpaqueDef(BuiltInDef):
     Representation of an opaque chuck of data
     """
 
+    __slots__ = ()
+
     def __init__(self):
         BuiltInDef.__init__(self, 'opaque')
         self.addParameters(['nbits', 'nbytes'])
@@ -836,12 +1218,49 @@ class OpaqueDef(BuiltInDef):
         return 8 * args.get('nbytes', 0) + args.get('nbits', 0)
 
 
+class BuiltInDefs(object):
+    """
+    Process-wide registry of built-in type definitions. The definitions are
+    created on first use, shared by all TypeDefCollections, and must not be
+    modified.
+    """
+
+    typedefs = None
+    typedefsByName = None
+
+    @staticmethod
+    def getTypeDefs():
+        if BuiltInDefs.typedefs is None:
+            typedefs = [UIntDef(i) for i in range(1, 65)]
+            typedefs += [SIntDef(i) for i in range(1, 65)]
+            typedefs += [BitDef(), ByteDef(), OpaqueDef()]
+            BuiltInDefs.typedefsByName = {t.getName(): t for t in typedefs}
+            BuiltInDefs.typedefs = tuple(typedefs)
+        return BuiltInDefs.typedefs
+
+    @staticmethod
+    def getTypeNames():
+        BuiltInDefs.getTypeDefs()
+        return BuiltInDefs.typedefsByName.viewkeys()
+
+    @staticmethod
+    def get(name):
+        BuiltInDefs.getTypeDefs()
+        return BuiltInDefs.typedefsByName.get(name)
+
+    @staticmethod
+    def has(name):
+        return BuiltInDefs.get(name) is not None
+
+
 # TODO: rename "ConstDef" -> "IntSymbolDef"
 class ConstDef(TypeDef):
     """
     Representation of a constant integer
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, name=None, value=None):
         TypeDef.__init__(self)
         self.setName(name)
@@ -860,7 +1279,7 @@ class ConstDef(TypeDef):
     def getValue(self):
         return self.value
 
-    def getRequiredSymbols(self):
+    def computeRequiredSymbols(self):
         return set()
 
 
@@ -869,6 +1288,9 @@ class InstanceDef(TypeDef):
     Representation of a type alias or instantiation
     """
 
+    __slots__ = ('args', 'typename', 'instantiation',
+            'instantiationTableEpoch')
+
     @staticmethod
     def mergeArgsDisjunct(args1, args2):
         merged = {}
@@ -889,6 +1311,8 @@ class InstanceDef(TypeDef):
         self.args = args if args else {}
         self.setName(name)
         self.typename = typename
+        self.instantiation = None
+        self.instantiationTableEpoch = None
 
     def getType(self):
         if self.isAlias():
@@ -919,8 +1343,15 @@ class InstanceDef(TypeDef):
     def getTypeName(self):
         return self.typename
 
+    def setTypeName(self, typename):
+        self.typename = typename
+        self.invalidateSummaries()
+        TypeDef.invalidateInstantiations()
+
     def setArgs(self, args):
         self.args = InstanceDef.mergeArgsDisjunct(self.args, args)
+        self.invalidateSummaries()
+        TypeDef.invalidateInstantiations()
 
     def getArgs(self, extArgs=None, includeBuiltIn=False):
         args = {}
@@ -942,14 +1373,14 @@ class InstanceDef(TypeDef):
                 for k, v in self.getArgs(extArgs, includeBuiltIn).iteritems()]
         return ', '.join(myargs)
 
-    def getRequiredSymbols(self):
-        s = TypeDef.getRequiredSymbols(self)
+    def computeRequiredSymbols(self):
+        s = TypeDef.computeRequiredSymbols(self)
         s.update([arg.getName() for arg in self.getArgs().itervalues() \
                 if isinstance(arg, IntSymbol)])
         return s
 
-    def dependsOnTypes(self):
-        s = TypeDef.dependsOnTypes(self)
+    def computeDependsOnTypes(self):
+        s = TypeDef.computeDependsOnTypes(self)
         s.update(set([self.typename]))
         return s
 
@@ -975,8 +1406,18 @@ class InstanceDef(TypeDef):
                     'InstanceDef "{0}"'.format(self.getName()))
 
     def followInstantiation(self, args=None):
-        return self.getTypeDefCollection()[self.getTypeName()] \
-                .followInstantiation(self.getArgs(args))
+        # The type definition at the end of the chain of aliases and the
+        # arguments collected along the way are cached. Additional arguments
+        # <args> are merged in as if passed along the chain.
+        if self.instantiationTableEpoch != TypeDef.instantiationEpoch:
+            self.instantiation = self.getTypeDefCollection()[ \
+                    self.getTypeName()].followInstantiation(self.getArgs())
+            self.instantiationTableEpoch = TypeDef.instantiationEpoch
+        typeDef, resolvedArgs = self.instantiation
+        if args:
+            return (typeDef, InstanceDef.mergeArgsDisjunct(resolvedArgs,
+                    self.getArgs(args)))
+        return (typeDef, dict(resolvedArgs))
 
     def getRawBitWidth(self, args=None, selections=None):
         typeDef, args = self.followInstantiation(args)
@@ -992,6 +1433,8 @@ class InstanceDef(TypeDef):
 
 class WrapperDef(TypeDef):
 
+    __slots__ = ('element',)
+
     def __init__(self):
         TypeDef.__init__(self)
         self.element = None
@@ -1006,8 +1449,10 @@ class WrapperDef(TypeDef):
         return self.element
 
     def setElement(self, element):
+        self.replaceChildName(self.element, element)
         self.element = element
         element.setParent(self)
+        self.invalidateSummaries()
 
     def embedElement(self, element):
         self.setElement(element)
@@ -1023,13 +1468,13 @@ class WrapperDef(TypeDef):
     def getChildren(self):
         return [self.getElement()] if self.getElement() else []
 
-    def getRequiredSymbols(self):
-        s = TypeDef.getRequiredSymbols(self)
+    def computeRequiredSymbols(self):
+        s = TypeDef.computeRequiredSymbols(self)
         s.update(self.getElement().getRequiredSymbols())
         return s
 
-    def dependsOnTypes(self):
-        s = TypeDef.dependsOnTypes(self)
+    def computeDependsOnTypes(self):
+        s = TypeDef.computeDependsOnTypes(self)
         s.update(self.getElement().dependsOnTypes())
         return s
 
@@ -1042,8 +1487,11 @@ class VectorDef(WrapperDef):
     Representation of a vector
     """
 
+    __slots__ = ('isItemBased', 'lengthUnit')
+
     def __init__(self):
         WrapperDef.__init__(self)
+        self.lengthUnit = None
 
     def getType(self):
         return 'Vector'
@@ -1098,6 +1546,8 @@ class StaticVectorDef(VectorDef):
     supplied length
     """
 
+    __slots__ = ('length',)
+
     def __init__(self, length=None, **args):
         VectorDef.__init__(self)
         self.isItemBased = args['isItemBased']
@@ -1109,20 +1559,18 @@ class StaticVectorDef(VectorDef):
     def setLength(self, length):
         if length is None or isinstance(length, IntElement):
             self.length = length
+            self.invalidateSummaries()
         else:
             raise Exception('Invalid length!')        
 
-    def getRequiredSymbols(self):
-        s = VectorDef.getRequiredSymbols(self)
+    def computeRequiredSymbols(self):
+        s = VectorDef.computeRequiredSymbols(self)
         if self.getLength():
             s.update(self.getLength().getRequiredSymbols())
         return s
 
     def getVectorDef(self):
-        try:
-            unit = str(self.lengthUnit)
-        except:
-            unit = ''
+        unit = str(self.lengthUnit) if self.lengthUnit else ''
         form = '[[{0}{1}]]' if self.isItemBased else '[{0}{1}]'
         return form.format(
             self.length if self.length is not None else '', unit)
@@ -1139,7 +1587,7 @@ class StaticVectorDef(VectorDef):
                 raise TPLError('In vector "{0}": Cannot determine raw ' + \
                         'bit width of indefinite length vector')
             width = self.length
-            if hasattr(self, 'lengthUnit') and self.lengthUnit:
+            if self.lengthUnit:
                 width = width * self.lengthUnit.getBitScale()
             else:
                 width = width * 8
@@ -1152,6 +1600,8 @@ class DynamicVectorDef(VectorDef):
     own embedded length field
     """
 
+    __slots__ = ('lengthMin', 'lengthMax')
+
     def __init__(self, lengthMin=None, lengthMax=None, **args):
         VectorDef.__init__(self)
         self.isItemBased = args['isItemBased']
@@ -1171,10 +1621,7 @@ class DynamicVectorDef(VectorDef):
         return self.getLengthMax().getValue()
 
     def getVectorDef(self):
-        try:
-            unit = str(self.lengthUnit)
-        except:
-            unit = ''
+        unit = str(self.lengthUnit) if self.lengthUnit else ''
         form = '<<{0}..{1}{2}>>' if self.isItemBased else '<{0}..{1}{2}>'
         lengthMin = self.lengthMin if self.lengthMin is not None else '?'
         lengthMax = self.lengthMax if self.lengthMax is not None else '?'
@@ -1187,6 +1634,8 @@ class DynamicVectorDef(VectorDef):
 
 class EnumItemAbstract(object):
 
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -1207,6 +1656,8 @@ class EnumItemAbstract(object):
 
 class EnumItemFallback(EnumItemAbstract):
 
+    __slots__ = ()
+
     def __init__(self, name):
         EnumItemAbstract.__init__(self, name)
 
@@ -1224,6 +1675,8 @@ class EnumItemFallback(EnumItemAbstract):
 
 class EnumItem(EnumItemAbstract):
 
+    __slots__ = ('minCode', 'maxCode')
+
     # TODO: allow enum items to cover multiple ranges
 
     def __init__(self, name, minCode=None, maxCode=None):
@@ -1288,6 +1741,8 @@ class EnumDef(TypeDef):
     Representation of an enumeration
     """
 
+    __slots__ = ('items', 'itemIndex', 'codeIndex')
+
     def __init__(self, items=None):
         TypeDef.__init__(self)
         self.resetItems()
@@ -1305,12 +1760,11 @@ class EnumDef(TypeDef):
             return self.getItems()[index]
         elif isinstance(index, str):
             # Find an item by its name
-            itemIter = (i for i in self.getItems() if i.getName() == index)
-            try:
-                return itemIter.next()
-            except StopIteration:
+            i = self.indexItems().get(index)
+            if i is None:
                 raise TPLError('In enum "{0}": Unknown item "{1}"' \
                         .format(self.getName(), index))
+            return self.getItems()[i]
         else:
             raise TPLError('In enum "{0}": Invalid item index type' \
                     .format(self.getName()))
@@ -1340,9 +1794,14 @@ class EnumDef(TypeDef):
 
     def resetItems(self):
         self.items = []
+        self.itemIndex = None
+        self.codeIndex = None
 
     def addItem(self, item):
+        if self.itemIndex is not None and item.getName() is not None:
+            self.itemIndex.setdefault(item.getName(), len(self.items))
         self.items += [item]
+        self.codeIndex = None
 
     def addItems(self, items):
         if items:
@@ -1360,6 +1819,59 @@ class EnumDef(TypeDef):
         return max([item.getMaxCodeValue() \
             for item in self.items if isinstance(item, EnumItem)])
 
+    def indexItems(self):
+        """ (Re)build the index mapping item names to the index of the first
+        item with that name """
+        if self.itemIndex is None:
+            self.itemIndex = {}
+            for i, item in enumerate(self.getItems()):
+                if item.getName() is not None:
+                    self.itemIndex.setdefault(item.getName(), i)
+        return self.itemIndex
+
+    def getFallbackItem(self):
+        fallbacks = [item for item in self.getItems() \
+                if isinstance(item, EnumItemFallback)]
+        return fallbacks[0] if fallbacks else None
+
+    def indexCodes(self):
+        """ (Re)build the interval index over the items' code ranges: a
+        tuple of the ranges' lower bounds (sorted), the ranges' upper bounds,
+        the corresponding items, and the fallback item """
+        if self.codeIndex is None:
+            ranges = sorted([(item.getMinCodeValue(), item.getMaxCodeValue(), i)
+                    for i, item in enumerate(self.getItems()) \
+                            if isinstance(item, EnumItem)])
+            self.codeIndex = (
+                    [r[0] for r in ranges],
+                    [r[1] for r in ranges],
+                    [self.getItems()[r[2]] for r in ranges],
+                    self.getFallbackItem())
+        return self.codeIndex
+
+    def getOverlappingItems(self):
+        """ Return a list of pairs of items whose code ranges overlap """
+        minCodes, maxCodes, items = self.indexCodes()[:3]
+        overlaps = []
+        # <upper> is the item reaching furthest up among the items seen so far
+        upper = None
+        for i in range(len(items)):
+            if upper is not None and minCodes[i] <= maxCodes[upper]:
+                overlaps += [(items[upper], items[i])]
+            if upper is None or maxCodes[i] > maxCodes[upper]:
+                upper = i
+        return overlaps
+
+    def lookupCode(self, value):
+        """ Return the item whose code range covers <value>, the fallback
+        item if there is no such item, or None if there is no fallback item
+        either. Code ranges are expected not to overlap (see selfCheck()) """
+        minCodes, maxCodes, items, fallback = self.indexCodes()
+        i = bisect.bisect_right(minCodes, value) - 1
+        if i >= 0 and value <= maxCodes[i]:
+            return items[i]
+        return fallback
+
     def getEnumBitWidth(self):
         return self.getNDigits(self.getMaxCodeValue(), 2)
 
@@ -1368,6 +1880,12 @@ class EnumDef(TypeDef):
                 if isinstance(item, EnumItemFallback)]) > 1:
             raise TPLCheckError('Multiple fallback items in enumeration "{0}"' \
                     .format(self.getName()))
+        overlaps = self.getOverlappingItems()
+        if overlaps:
+            first, second = overlaps[0]
+            raise TPLCheckError('Overlapping codes of items "{0}" and "{1}" ' \
+                    'in enumeration "{2}"'.format(first.getName('<none>'),
+                            second.getName('<none>'), self.getName()))
 
     def getTPLTriple(self):
         return (pre, self.getName(), self.getSizeStr())
@@ -1396,6 +1914,8 @@ class StructDef(TypeDef):
     Representation of a structure, i.e. an ordered composition of types
     """
 
+    __slots__ = ('members', 'memberIndex', 'selectIndices')
+
     def __init__(self, members=None):
         TypeDef.__init__(self)
         self.resetMembers()
@@ -1419,21 +1939,8 @@ class StructDef(TypeDef):
             # Return the member by its index
             return self.getMembers()[index]
         elif isinstance(index, str):
-            # Find a member by its name: define an iterator that should only
-            # find one member, namely the one with the name given by <index>
-            memIter = (m for m in self.getMembers() if m.getName() == index)
-            try:
-                # If a member with the name <index> exists the iterator will
-                # return that single element, or raise an exception otherwise
-                return memIter.next()
-            except StopIteration:
-                raise TPLError('In struct "{0}": Unknown member "{1}"' \
-                        .format(self.getName(), index))
-            # This should not happen as the statement in the try block above is
-            # expected to either return from this function or raise a
-            # StopIteration exception
-            raise TPLError('In struct "{0}": Unknown error' \
-                    .format(self.getName()))
+            # Find a member by its name
+            return self.getMembers()[self.getMemberIndex(index)]
         else:
             # The member index type is invalid as it seems to be neither an
             # integer nor a string, therefore raise an exception
@@ -1452,15 +1959,24 @@ class StructDef(TypeDef):
     def resetMembers(self):
         """ Remove all members from this struct """
         self.members = []
+        self.childNames = None
+        self.invalidateMemberIndex()
+        TypeDef.invalidateInstantiations()
+        self.invalidateSummaries()
 
     def addMember(self, member):
         """ Add a new member to this struct """
         # Make sure a member with the same name does not exist (except for
         # anonymous members whose name is <None>)
-        if member.getName() not in self.getMemberNames(True):
+        if not self.hasMemberName(member.getName(), True):
             # Add the new member to the list of members and update its parent
             # relation accordingly
+            if self.memberIndex is not None:
+                self.memberIndex.setdefault(member.getName(), len(self.members))
+                if isinstance(member, SelectDef):
+                    self.selectIndices += [len(self.members)]
             self.members += [member]
+            self.replaceChildName(None, member)
             member.setParent(self)
         else:
             # There is already another member with the same name in this
@@ -1475,8 +1991,15 @@ class StructDef(TypeDef):
                 self.addMember(m)
 
     def setMember(self, member, index):
+        old = self.members[index]
+        self.replaceChildName(old, member)
+        if isinstance(old, SelectDef) != isinstance(member, SelectDef):
+            self.invalidateMemberIndex()
         self.members[index] = member
+        if old.name != member.name:
+            self.childRenamed(member, old.name)
         member.setParent(self)
+        self.invalidateSummaries()
 
     def getMembers(self):
         return self.members
@@ -1500,9 +2023,66 @@ class StructDef(TypeDef):
     def getMemberNames(self, includeEmbedded=False, disambiguate=False):
         return self.getMemberNameCounts(includeEmbedded, disambiguate).keys()
 
+    def invalidateMemberIndex(self):
+        self.memberIndex = None
+        self.selectIndices = None
+
+    def indexMembers(self):
+        """ (Re)build the index mapping member names to the index of the
+        first member with that name, and the list of indices of embedded
+        select members """
+        if self.memberIndex is None:
+            self.memberIndex = {}
+            self.selectIndices = []
+            for i, m in enumerate(self.getMembers()):
+                self.memberIndex.setdefault(m.getName(), i)
+                if isinstance(m, SelectDef):
+                    self.selectIndices += [i]
+        return self.memberIndex
+
+    def childRenamed(self, child, oldName):
+        index = self.memberIndex
+        if index is None:
+            return
+        i = index.get(oldName)
+        if i is None or self.members[i] is not child:
+            # the member hasn't been indexed by its old name
+            self.invalidateMemberIndex()
+            return
+        del index[oldName]
+        # only anonymous members may share their name (see addMember())
+        if oldName is None:
+            for j in xrange(i + 1, len(self.members)):
+                if self.members[j].name is None:
+                    index[oldName] = j
+                    break
+        if index.setdefault(child.name, i) > i:
+            index[child.name] = i
+
     def getMemberIndex(self, name):
-        return (i for i, m in enumerate(self.getMembers()) \
-                if m.getName() == name).next()
+        index = self.indexMembers().get(name)
+        if index is None:
+            raise TPLError('In struct "{0}": Unknown member "{1}"' \
+                    .format(self.getName(), name))
+        return index
+
+    def hasMemberName(self, name, includeEmbedded=False):
+        """ Equivalent to <name in self.getMemberNames(includeEmbedded)> """
+        index = self.indexMembers().get(name)
+        if index is not None:
+            if not includeEmbedded or \
+                    not isinstance(self.members[index], SelectDef):
+                return True
+            # the first member of that name is an embedded select, which
+            # doesn't count itself
+            if [m for m in self.getMembers()[index:] if m.getName() == name \
+                    and not isinstance(m, SelectDef)]:
+                return True
+        if includeEmbedded:
+            for i in self.selectIndices:
+                if name in self.members[i].getMemberNameCounts(True):
+                    return True
+        return False
 
     def getNMembers(self):
         return len(self.getMembers())
@@ -1515,25 +2095,47 @@ class StructDef(TypeDef):
     def getChildren(self):
         return self.getMembers()
 
-    def getKnownSymbols(self, ref=None):
-        symbols = TypeDef.getKnownSymbols(self, self)
-        if ref in self.getMembers():
-            localMembers = self.getMembers()[0:self.getMembers().index(ref)]
-            symbols.update({m.getName(): self for m in localMembers})
-        return symbols
-
-    def getRequiredSymbols(self):
+    def getMemberPosition(self, member):
+        """ Return the index of member <member> (the node itself, not its
+        name) or None if it isn't a member of this struct """
+        i = self.indexMembers().get(member.name)
+        if i is not None and self.members[i] is member:
+            return i
+        return next((i for i, m in enumerate(self.members) if m is member),
+                None)
+
+    def lookUpLocalSymbol(self, var, child=None):
+        # each member additionally knows the members preceding it
+        if child is not None:
+            i = self.indexMembers().get(var)
+            if i is not None:
+                position = self.getMemberPosition(child)
+                if position is not None and i < position:
+                    return (self, i)
+        return TypeDef.lookUpLocalSymbol(self, var)
+
+    def addLocalSymbols(self, scope, child=None):
+        TypeDef.addLocalSymbols(self, scope)
+        if child is not None:
+            position = self.getMemberPosition(child)
+            for i, m in enumerate(self.getMembers()[:position or 0]):
+                scope[m.getName()] = (self, i)
+
+    def computeRequiredSymbols(self):
         """ Return a set of variable names that this struct depends on """
-        s = TypeDef.getRequiredSymbols(self)
-        for m in self.getMembers():
+        s = TypeDef.computeRequiredSymbols(self)
+        members = self.getMembers()
+        for m in members:
             s.update(m.getRequiredSymbols())
-            localVars = [var for var, where in m.getKnownSymbols().iteritems() \
-                    if where is self]
-            s.difference_update(set(localVars))
+        if members:
+            # the symbols this struct defines for its members, i.e. its
+            # parameters and the members preceding the last one
+            s.difference_update(self.getParamList())
+            s.difference_update([m.getName() for m in members[:-1]])
         return s
 
-    def dependsOnTypes(self):
-        s = TypeDef.dependsOnTypes(self)
+    def computeDependsOnTypes(self):
+        s = TypeDef.computeDependsOnTypes(self)
         for m in self.getMembers():
             s.update(m.dependsOnTypes())
         return s
@@ -1663,9 +2265,11 @@ class StructDef(TypeDef):
 
 class CaseDef(StructDef):
 
+    __slots__ = ('cond',)
+
     def __init__(self, cond=None, members=None):
         StructDef.__init__(self, members)
-        self.cond = cond
+        self.cond = tuple(cond) if cond is not None else None
 
     def isReal(self):
         return False
@@ -1691,6 +2295,14 @@ class CaseDef(StructDef):
         else:
             return selectDef
 
+    def getConds(self):
+        return self.cond
+
+    def setConds(self, cond):
+        self.cond = tuple(cond)
+        if isinstance(self.getParent(), SelectDef):
+            self.getParent().invalidateCaseIndex()
+
     def getCondStr(self):
         return ', '.join([s for s in self.cond])
 
@@ -1717,6 +2329,8 @@ class CaseDef(StructDef):
 
 class DefaultCaseDef(CaseDef):
 
+    __slots__ = ()
+
     def __init__(self, members=None):
         CaseDef.__init__(self, None, members)
 
@@ -1734,6 +2348,8 @@ class DefaultCaseDef(CaseDef):
 
 class SelectDef(TypeDef):
 
+    __slots__ = ('testSymbol', 'cases', 'caseIndex')
+
     def __init__(self, testSymbol=None, cases=None):
         TypeDef.__init__(self)
         self.testSymbol = testSymbol
@@ -1747,22 +2363,19 @@ class SelectDef(TypeDef):
         return True
 
     def getDefaultCase(self):
-        defaultCases = [c for c in self.getCases() \
-                if isinstance(c, DefaultCaseDef)]
         # there shouldn't be more than one default case
-        return defaultCases[0] if defaultCases else None
+        i = self.indexCases().get(None)
+        return self.getCases()[i] if i is not None else None
 
     def __getitem__(self, index):
         if isinstance(index, int):
             return self.getCases()[index]
         elif isinstance(index, str):
-            matchingCases = [c for c in self.getCases() \
-                    if not isinstance(c, DefaultCaseDef) \
-                            and index in list(c.cond)]
-            if matchingCases:
-                return matchingCases[0]
+            i = self.indexCases().get(index)
+            if i is not None:
+                return self.getCases()[i]
             else:
-                return self.getDefaultCase()            
+                return self.getDefaultCase()
         else:
             raise Exception('SelectDef: Unknown index type')
 
@@ -1778,9 +2391,16 @@ class SelectDef(TypeDef):
 
     def resetCases(self):
         self.cases = []
+        self.childNames = None
+        self.caseIndex = None
+        TypeDef.invalidateInstantiations()
+        self.invalidateSummaries()
 
     def addCase(self, case):
+        if self.caseIndex is not None:
+            self.indexCase(case, len(self.cases))
         self.cases += [case]
+        self.replaceChildName(None, case)
         case.setParent(self)
 
     def addCases(self, cases):
@@ -1789,12 +2409,37 @@ class SelectDef(TypeDef):
                 self.addCase(c)
 
     def setCase(self, case, index):
+        self.replaceChildName(self.cases[index], case)
+        if self.cases[index].cond != case.cond:
+            self.caseIndex = None
         self.cases[index] = case
         case.setParent(self)
+        self.invalidateSummaries()
 
     def getCases(self):
         return self.cases
 
+    def invalidateCaseIndex(self):
+        """ Called when the conditions of one of the cases have changed """
+        self.caseIndex = None
+
+    def indexCase(self, case, index):
+        if isinstance(case, DefaultCaseDef):
+            # the default case is indexed by <None>
+            self.caseIndex.setdefault(None, index)
+        else:
+            for cond in case.cond:
+                self.caseIndex.setdefault(cond, index)
+
+    def indexCases(self):
+        """ (Re)build the index mapping case conditions to the index of the
+        first (non-default) case matching that condition """
+        if self.caseIndex is None:
+            self.caseIndex = {}
+            for i, c in enumerate(self.getCases()):
+                self.indexCase(c, i)
+        return self.caseIndex
+
     def getChildren(self):
         return self.getCases()
 
@@ -1847,15 +2492,15 @@ class SelectDef(TypeDef):
                     'Unbalanced number of case members in definition of "{0}"' \
                     .format(self.getChainedName('/')))
 
-    def getRequiredSymbols(self):
-        s = TypeDef.getRequiredSymbols(self)
+    def computeRequiredSymbols(self):
+        s = TypeDef.computeRequiredSymbols(self)
         s.update(set([self.getTestSymbolName()]))
         for c in self.getCases():
             s.update(c.getRequiredSymbols())
         return s
 
-    def dependsOnTypes(self):
-        s = TypeDef.dependsOnTypes(self)
+    def computeDependsOnTypes(self):
+        s = TypeDef.computeDependsOnTypes(self)
         for c in self.getCases():
             s.update(c.dependsOnTypes())
         return s
@@ -1883,6 +2528,8 @@ class SelectDef(TypeDef):
 
 class FragmentDef(WrapperDef):
 
+    __slots__ = ()
+
     def __init__(self):
         WrapperDef.__init__(self)
 
@@ -0,0 +1,247 @@
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+#
+# Structural hash-consing of type definitions: top-level type definitions that
+# are structurally identical (i.e. that only differ in their names) are merged
+# into one, and references to the merged type definitions are redirected.
+# Likewise, structurally identical case branches of select statements are
+# merged into one case branch with the conditions of all of them.
+#
+
+from core import *
+
+
+# Attributes of IR nodes that don't contribute to their structure
+ignoredAttributes = cacheAttributes | generatorAttributes \
+        | frozenset(['parent', 'typeID', 'tplLineNo'])
+
+# Per class: the list of attributes making up its instances' structure
+structuralAttributes = {}
+
+
+#
+# _____________________________________________________________________________
+#
+
+def getStructuralAttributes(cls):
+    attributes = structuralAttributes.get(cls)
+    if attributes is None:
+        attributes = []
+        for c in reversed(cls.__mro__):
+            attributes += [a for a in c.__dict__.get('__slots__', ()) \
+                    if a not in ignoredAttributes and a not in attributes]
+        structuralAttributes[cls] = attributes
+    return attributes
+
+
+def getStructuralKey(obj, isRoot=False, renames=None):
+    """ Return a hashable representation of the structure of <obj>. The name
+    (and for case branches the conditions) of <obj> itself is ignored if
+    <isRoot> is True. References to types named in the dictionary <renames>
+    are taken as references to the types they are mapped to """
+    if isinstance(obj, (TypeDef, SizeDef, IntElement, EnumItemAbstract)):
+        key = [obj.__class__]
+        for attr in getStructuralAttributes(obj.__class__):
+            if isRoot and attr in ('name', 'cond'):
+                continue
+            value = getattr(obj, attr, None)
+            if renames and attr == 'typename' and isinstance(obj, InstanceDef):
+                value = renames.get(value, value)
+            key += [getStructuralKey(value, renames=renames)]
+        return tuple(key)
+    elif isinstance(obj, (list, tuple)):
+        return tuple([getStructuralKey(v, renames=renames) for v in obj])
+    elif isinstance(obj, dict):
+        return tuple(sorted([(k, getStructuralKey(v, renames=renames)) \
+                for k, v in obj.iteritems()]))
+    else:
+        return obj
+
+
+def redirectTypeReferences(typedef, renames):
+    if isinstance(typedef, InstanceDef) and typedef.getTypeName() in renames:
+        typedef.setTypeName(renames[typedef.getTypeName()])
+    for child in typedef.getChildren():
+        redirectTypeReferences(child, renames)
+
+
+def collectDistinguishingTypeNames(typedef, names):
+    """ Add to <names> the names of types that disambiguate equally named
+    members within select statements (see CaseDef.disambiguateMemberName())
+    and therefore must not be merged with other types """
+    if isinstance(typedef, SelectDef):
+        counts = typedef.getMemberNameCounts(True)
+        cases = list(typedef.getCases())
+        while cases:
+            case = cases.pop()
+            for m in case.getMembers():
+                if isinstance(m, SelectDef):
+                    cases += m.getCases()
+                elif counts.get(m.getName(), 0) > 1:
+                    names.add(m.followInstantiation()[0].getName())
+    for child in typedef.getChildren():
+        collectDistinguishingTypeNames(child, names)
+
+
+#
+# _____________________________________________________________________________
+#
+
+def deduplicateTypeDefs(self, keep=None):
+    """ Merge structurally identical type definitions of this collection
+    into one (the first one), except for those named in <keep>. References
+    to merged type definitions are redirected accordingly. Return the number
+    of type definitions that have been removed """
+
+    nMerged = 0
+
+    # Merging type definitions may render type definitions referring to them
+    # identical, therefore repeat until nothing is left to merge
+    while True:
+        protected = set(keep) if keep else set()
+        for t in self.getTypeDefs():
+            collectDistinguishingTypeNames(t, protected)
+        canonical = {}
+        merged = {}
+        for t in self.getTypeDefs():
+            if t.getName() in protected:
+                continue
+            first = canonical.setdefault(getStructuralKey(t, True), t)
+            if first is not t:
+                merged[t.getName()] = first.getName()
+        if not merged:
+            break
+        typedefs = [t for t in self.getTypeDefs() if t.getName() not in merged]
+        self.clear()
+        self.addDefs(typedefs)
+        for t in typedefs:
+            redirectTypeReferences(t, merged)
+        nMerged += len(merged)
+
+    return nMerged
+
+TypeDefCollection.deduplicate = deduplicateTypeDefs
+
+
+def getStructuralEquivalents(self):
+    """ Return a dictionary mapping the names of type definitions of this
+    collection to the name of the first type definition structurally
+    identical to them (i.e. the one deduplicate() would merge them into),
+    without modifying any type definition """
+    renames = {}
+    # Taking type definitions as identical may render type definitions
+    # referring to them identical, therefore repeat until nothing changes
+    while True:
+        canonical = {}
+        equivalents = {}
+        for t in self.getTypeDefs():
+            first = canonical.setdefault(
+                    getStructuralKey(t, True, renames), t)
+            if first is not t:
+                equivalents[t.getName()] = first.getName()
+        if equivalents == renames:
+            return renames
+        renames = equivalents
+
+TypeDefCollection.getStructuralEquivalents = getStructuralEquivalents
+
+
+#
+# _____________________________________________________________________________
+#
+
+def mergeCases(select, renames=None):
+    """ Merge structurally identical case branches of <select> into the first
+    one, taking references to types named in <renames> as references to the
+    types they are mapped to (see getStructuralKey()). Return the number of
+    case branches that have been removed """
+    # A case branch is selected by the conditions not matched by any of the
+    # case branches before it. Only these conditions are added to the first
+    # identical case branch, which therefore is selected exactly in the same
+    # situations as the merged ones. Case branches following a default case
+    # branch are left alone (they are rejected by SelectDef.selfCheck()).
+    canonical = {}
+    matched = set()
+    cases = []
+    for i, case in enumerate(select.getCases()):
+        if isinstance(case, DefaultCaseDef):
+            cases += select.getCases()[i:]
+            break
+        conds = [c for c in case.getConds() if c not in matched]
+        matched.update(case.getConds())
+        first = canonical.setdefault(
+                getStructuralKey(case, True, renames), case)
+        if first is case:
+            cases += [case]
+        else:
+            first.setConds(first.getConds() \
+                    + tuple(c for c in conds if c not in first.getConds()))
+    nMerged = len(select.getCases()) - len(cases)
+    if nMerged:
+        select.resetCases()
+        select.addCases(cases)
+    return nMerged
+
+
+def mergeCasesRecursively(typedef, renames):
+    # merge case branches of nested select statements first as this might
+    # render the case branches they are embedded in identical
+    nMerged = 0
+    for child in typedef.getChildren():
+        nMerged += mergeCasesRecursively(child, renames)
+    if isinstance(typedef, SelectDef):
+        nMerged += mergeCases(typedef, renames)
+    return nMerged
+
+
+def mergeCaseDefs(self):
+    """ Merge structurally identical case branches of all select statements
+    in this collection, where case branches referring to structurally
+    identical (but differently named) types are identical, too. The merged
+    case branch refers to the types of the first one, which changes the
+    features extracted for the others (e.g. ".../T1%x" becomes ".../T0%x").
+    Return the number of case branches that have been removed """
+    nMerged = 0
+    # Merging case branches may render the type definitions containing them
+    # identical, therefore repeat until nothing is left to merge
+    while True:
+        renames = self.getStructuralEquivalents()
+        n = sum([mergeCasesRecursively(t, renames) \
+                for t in self.getTypeDefs()])
+        if not n:
+            return nMerged
+        nMerged += n
+
+TypeDefCollection.mergeCases = mergeCaseDefs
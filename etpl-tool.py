@@ -38,12 +38,15 @@
 #
 
 import sys
-from pyparsing import ParseBaseException
+import os
+import hashlib
 from core import *
-from parse import *
-from generate_cpp import *
-import normalize
-import features
+from snapshot import SNAPSHOT_MAGIC, encodeSnapshot, decodeSnapshot
+from compilecache import CompileCache
+
+# The modules implementing the processing pipeline (in particular the parser
+# and pyparsing) are only imported once they are needed, which might not be
+# the case if results can be taken from the cache
 
 
 #
@@ -58,10 +61,13 @@ def printError(msg):
 # _____________________________________________________________________________
 #
 def printSyntaxError(error):    
+    from parse import getLineIndex
+    index = getLineIndex(error.pstr)
+    lineNo, col = index.getLineAndColumn(error.loc)
     print(TextFormatter.makeBoldRed('Error in line {0}: {1}' \
-            .format(error.lineno, error.msg)))
-    print(error.line)
-    print(' ' * (error.col - 1) + '^')
+            .format(lineNo, error.msg)))
+    print(index.getLine(lineNo))
+    print(' ' * (col - 1) + '^')
     quit()
 
 
@@ -72,9 +78,140 @@ def usage():
     print('Usage: ./etpl-tool.py [OPTIONS] <input-file>')
     print('Options:')
     print(' -p<filename>    Write message parsing code (C++) to file <filename>')
-    print(' -b<basetype>    Select base type for further processing')
+    print(' -b<basetype>    Select base type(s) (comma-separated) for further processing')
     print(' -F<filename>    Write feature extraction code (C++) to file <filename>')
     print(' -f<filename>    Write list of features to file <filename>')
+    print(' -d              Merge structurally identical type definitions (pass dedup)')
+    print(' -r              Remove type definitions unreachable from base type(s) (pass unreachable)')
+    print(' -e<passes>      Enable optional processing pass(es) (comma-separated)')
+    print(' -x<passes>      Disable optional processing pass(es) (comma-separated)')
+    print(' -t              Print time taken and objects allocated per processing pass')
+    print(' -s<filename>    Write snapshot of checked type definitions to file <filename>')
+    print(' -B<backend>     Use parser backend <backend> (pyparsing (default) or rd)')
+    print(' -c<directory>   Take results from and add them to cache in <directory>,')
+    print('                 and only re-parse top-level definitions changed since the last run')
+    print('The input file may also be a snapshot written using option -s, which has been')
+    print('processed already (options -d, -r, -e, and -x do not apply).')
+    print('Processing passes (in order): vectors (optional), normalize, unreachable (optional),')
+    print('dedup (optional), cases (optional), sort, typeids, aliases (optional),')
+    print('check (optional)')
+    print('Pass vectors names the length field of a vector <name> _N_<name> (a reserved name),')
+    print('which changes the features extracted.')
+    print('Pass cases merges case branches referring to structurally identical (but differently')
+    print('named) types into the first one, whose types are then used for all of them, which')
+    print('changes the features extracted.')
+
+
+#
+# _____________________________________________________________________________
+#
+def makePassManager(baseTypeNames):
+    """ Return a pass manager running the processing passes following
+    parsing, with the optional passes vectors, unreachable, dedup, and cases
+    disabled """
+
+    from passes import PassManager
+
+    def inlineVectors(typedefs):
+        import normalize
+        return typedefs.inlineVectors()
+
+    def normalizeTypeDefs(typedefs):
+        # Lowering of vectors, flattening of structs into top-level type
+        # definitions, and default naming are interleaved per node
+        import normalize
+        typedefs.normalize()
+
+    def mergeCases(typedefs):
+        import dedup
+        return typedefs.mergeCases()
+
+    def deduplicate(typedefs):
+        import dedup
+        return typedefs.deduplicate(baseTypeNames)
+
+    def printTypeDefs(title):
+        def report(typedefs, result):
+            print '='*50 + '\n{0}:\n'.format(title) + '='*50 + '\n'
+            print typedefs, '\n'*2
+        return report
+
+    def printMessage(msg):
+        def report(typedefs, result):
+            print(msg.format(result))
+        return report
+
+    passes = PassManager()
+    passes.register('vectors', inlineVectors, optional=True, enabled=False,
+            report=printMessage('Inlined {0} length-prefixed vector(s)\n'))
+    passes.register('normalize', normalizeTypeDefs,
+            report=printTypeDefs('After normalization'))
+    passes.register('unreachable',
+            lambda typedefs: typedefs.removeUnreachable(baseTypeNames),
+            ['normalize'], optional=True, enabled=False,
+            report=printMessage('Removed {0} unreachable type definition(s)\n'))
+    passes.register('dedup', deduplicate, ['normalize'], optional=True,
+            enabled=False, report=printMessage(
+                    'Merged {0} structurally identical type definition(s)\n'))
+    passes.register('cases', mergeCases, ['normalize'], optional=True,
+            enabled=False, report=printMessage(
+                    'Merged {0} structurally identical case branch(es)\n'))
+    passes.register('sort', lambda typedefs: typedefs.sort(), ['normalize'])
+    passes.register('typeids', lambda typedefs: typedefs.generateTypeIDs(),
+            ['sort'], report=printTypeDefs('After disentangling'))
+    passes.register('aliases',
+            lambda typedefs: typedefs.resolveInstantiations(), ['sort'],
+            optional=True)
+    passes.register('check', lambda typedefs: typedefs.check(), ['sort'],
+            optional=True)
+    return passes
+
+
+#
+# _____________________________________________________________________________
+#
+def compileInput(text, passes, cache=None, chunkCacheName=None,
+        backend=None, passStats=False):
+
+    from parse import parse, EtplParseException, ChunkCache, DEFAULT_BACKEND
+
+    # ===== Parse input file =====
+    chunkCache = None
+    if cache:
+        # only parse the top-level definitions changed since the last run
+        chunkCache = ChunkCache()
+        if cache.has(chunkCacheName, True):
+            chunkCache.loads(cache.load(chunkCacheName, True))
+    try:
+        typedefs = parse(text, chunkCache, backend or DEFAULT_BACKEND)
+    except EtplParseException as e:
+        printSyntaxError(e.error)
+    except TPLError as e:
+        printError(str(e))
+    if chunkCache:
+        print('Parsed {0} of {1} top-level chunk(s)\n'.format(
+                chunkCache.nMisses, chunkCache.nMisses + chunkCache.nHits))
+        chunkCache.prune()
+        cache.store(chunkCacheName, chunkCache.dumps(), True)
+
+    # ===== Print before normalization =====
+    print '='*50 + '\nBefore normalization:\n' + '='*50 + '\n'
+    print typedefs, '\n'*2
+
+    # ===== Print generated source code =====
+    print '='*50 + '\nGenerated source code:\n' + '='*50 + '\n'
+    print typedefs.getTPLCode()
+    print '\n'
+
+    # ===== Normalize, sort, check, ... =====
+    try:
+        passes.run(typedefs, passStats)
+    except TPLError as e:
+        printError(str(e))
+    if passStats:
+        print(passes.getStatsStr() + '\n')
+
+    return typedefs
 
 
 #
@@ -88,6 +225,14 @@ def main(argv):
         'b': None,  # Base type for further processing
         'F': None,  # Output filename for feature extraction code (C++)
         'f': None,  # Output filename for feature list
+        'd': None,  # Merge structurally identical type definitions
+        'r': None,  # Remove type definitions unreachable from base type(s)
+        's': None,  # Output filename for snapshot of checked type definitions
+        'c': None,  # Cache directory
+        'B': None,  # Parser backend
+        'e': None,  # Enable optional processing passes
+        'x': None,  # Disable optional processing passes
+        't': None,  # Print time and allocations per processing pass
     }
     argFileIndex = 0
     for i, arg in enumerate(argv):
@@ -100,9 +245,6 @@ def main(argv):
         elif len(arg) < 3:
             # >>> Single flag >>>
             args[arg[1]] = True
-        elif arg[1] in '':
-            # >>> Integer argument >>>
-            args[arg[1]] = int(arg[2:])
         else:
             # >>> Other (e.g., string) argument >>>
             args[arg[1]] = arg[2:]
@@ -112,87 +254,114 @@ def main(argv):
         return
     inputFilename = argv[argFileIndex]
     parsingCodeFilename = args['p']
-    baseTypeName = args['b']
+    baseTypeNames = args['b'].split(',') if args['b'] else []
     featureCodeFilename = args['F']
     featureListFilename = args['f']
+    snapshotFilename = args['s']
+    cacheDirectory = args['c']
+    backend = args['B']
+    passStats = bool(args['t'])
 
-    print('\n\033[1m*** etpl-tool: A parser/compiler for eTPL ***\033[0m\n')
-
-    # ===== Read input files =====
-    with open(inputFilename, 'r') as f:
-        text = ''.join([line for line in f])
-
-    # ===== Parse input file =====
+    passes = makePassManager(baseTypeNames)
     try:
-        typedefs = parse(text)
-    except ParseBaseException as e:
-        printSyntaxError(e)
-    except EtplParseException as e:
-        printSyntaxError(e.error)
+        for name in (args['e'].split(',') if args['e'] else []) \
+                + (['dedup'] if args['d'] else []) \
+                + (['unreachable'] if args['r'] else []):
+            passes.enable(name)
+        for name in args['x'].split(',') if args['x'] else []:
+            passes.disable(name)
+        passes.getSchedule()
     except TPLError as e:
-        printError(str(e))
-
-    # ===== Print before normalization =====
-    print '='*50 + '\nBefore normalization:\n' + '='*50 + '\n'
-    print typedefs, '\n'*2
+        print(str(e))
+        usage()
+        return
 
-    # ===== Print generated source code =====
-    print '='*50 + '\nGenerated source code:\n' + '='*50 + '\n'
-    print typedefs.getTPLCode()
-    print '\n'
+    if 'unreachable' in passes.getEnabledPassNames() and not baseTypeNames:
+        print('Missing base type for removing unreachable types.')
+        usage()
+        return
+    if (featureCodeFilename or featureListFilename) \
+            and len(baseTypeNames) != 1:
+        print('Need exactly one base type for features.')
+        usage()
+        return
 
-    # ===== Normalize =====
-    try:
-        typedefs = typedefs.normalize()
-    except TPLError as e:
-        printError(str(e))
+    print('\n\033[1m*** etpl-tool: A parser/compiler for eTPL ***\033[0m\n')
 
-    # ===== Print after normalization =====
-    print '='*50 + '\nAfter normalization:\n' + '='*50 + '\n'
-    print typedefs, '\n'*2
+    # ===== Read input file =====
+    with open(inputFilename, 'r') as f:
+        text = ''.join([line for line in f])
 
-    # ===== Resolve dependencies =====
-    try:
-        typedefs.sort()
-        typedefs.generateTypeIDs()
-    except TPLError as e:
-        printError(str(e))
+    # The passes have been run on a snapshot's type definitions already
+    if text.startswith(SNAPSHOT_MAGIC) and any([args[o] for o in 'drex']):
+        print('Options -d, -r, -e, and -x cannot be used with a snapshot as input file.')
+        usage()
+        return
 
-    # ===== Print after sorting =====
-    print '='*50 + '\nAfter disentangling:\n' + '='*50 + '\n'
-    print typedefs, '\n'*2
+    # The (cacheable) artifacts to produce and the files to write them to
+    outputs = [(name, filename) for name, filename in [
+            ('parser.cpp', parsingCodeFilename),
+            ('features.cpp', featureCodeFilename),
+            ('features.txt', featureListFilename),
+            ('snapshot', snapshotFilename)] if filename]
+
+    # ===== Look up cache =====
+    cache = None
+    if cacheDirectory:
+        try:
+            cache = CompileCache(cacheDirectory, text, {
+                'b': ','.join(baseTypeNames),
+                'passes': ','.join(passes.getEnabledPassNames())})
+        except TPLError as e:
+            printError(str(e))
+        if outputs and all([cache.has(name) for name, _ in outputs]):
+            for name, filename in outputs:
+                with open(filename, 'wb') as file:
+                    file.write(cache.load(name))
+            print('Took results from cache (entry {0})'.format(cache.getKey()))
+            return
 
-    # ===== CHECK =====
     try:
-        typedefs.check()
+        if cache and cache.has('snapshot'):
+            # ===== Load snapshot from cache =====
+            typedefs = decodeSnapshot(cache.load('snapshot'))
+        elif text.startswith(SNAPSHOT_MAGIC):
+            # ===== Load snapshot =====
+            typedefs = decodeSnapshot(text, inputFilename)
+        else:
+            # chunks are cached per input file
+            chunkCacheName = 'chunks-{0}'.format(
+                    hashlib.sha1(os.path.abspath(inputFilename)).hexdigest())
+            typedefs = compileInput(text, passes, cache, chunkCacheName,
+                    backend, passStats)
     except TPLError as e:
         printError(str(e))
 
+    artifacts = {}
+
+    # ===== Write snapshot =====
+    if snapshotFilename or cache:
+        artifacts['snapshot'] = encodeSnapshot(typedefs)
 
     # ===== Generate parsing source code =====
     if parsingCodeFilename:
-        with open(parsingCodeFilename, "w") as file:
-            src = str(typedefs.generateCodeCpp())
-            file.write(src)
+        import generate_cpp
+        artifacts['parser.cpp'] = str(typedefs.generateCodeCpp())
 
     # ===== Generate feature list and extraction source code =====
     if featureCodeFilename or featureListFilename:
-
-        if not baseTypeName:
-            print('Missing base type for features.')
-            usage()
-            return
-
+        import features
         featureCode, featureList = features.makeFeatures(
-                typedefs[baseTypeName].getFeatures(True))
-
-        if featureCodeFilename:
-            with open(featureCodeFilename, "w") as file:
-                file.write('\n'.join(featureCode))
-
-        if featureListFilename:
-            with open(featureListFilename, "w") as file:
-                file.write('\n'.join(featureList))
+                typedefs[baseTypeNames[0]].getFeatures(True))
+        artifacts['features.cpp'] = '\n'.join(featureCode)
+        artifacts['features.txt'] = '\n'.join(featureList)
+
+    for name, filename in outputs:
+        with open(filename, 'wb') as file:
+            file.write(artifacts[name])
+    if cache:
+        for name, data in artifacts.iteritems():
+            cache.store(name, data)
 
 
 #
@@ -432,10 +432,11 @@ def genCodeCpp_generateCodeCpp_TypeDefCollection(self):
     # some (hopefully) temporary hack
     code.addDependency(strOpaqueFieldHeader)
 
+    for t in BuiltInDefs.getTypeDefs():
+        t.applyCppClassName()
+
     for t in self.getTypeDefs():
-        if isinstance(t, BuiltInDef):
-            t.applyCppClassName()
-        elif not isinstance(t, ConstDef):
+        if not isinstance(t, ConstDef):
 #            print('Generating code for {0}...'.format(t.getName()))
             code.addFragment(t.generateCode())
 #            try:
@@ -970,11 +971,11 @@ def genCodeCpp_generateCodeExpand_StructDef(self):
 
         # determine which local variables the current member depends on
         requiredVars = m.getRequiredSymbols()
-        knownVarDefs = m.getKnownSymbols()
         classParams = self.getParamList()
-        requiredLocalVars = sorted([self.getMemberIndex(var) \
-                for var in requiredVars \
-                if knownVarDefs.get(var, None) is self and var not in classParams])
+        symbols = [m.lookUpSymbol(var) for var in requiredVars \
+                if var not in classParams]
+        requiredLocalVars = sorted([where[1] for where in symbols \
+                if where is not None and where[0] is self])
         maxRequiredLocalVar = max([-1] + requiredLocalVars)
 
         # TODO: support optional members
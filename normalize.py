@@ -35,19 +35,34 @@ from collections import Set
 from itertools import count
 from core import *
 
-# TODO: make these functions operating on current collection (instead of
-# creating a new one)
-
 
 #
 # _____________________________________________________________________________
 #
 
 def normalizeTypeDefs(self):
-    normalized = TypeDefCollection(self.getGlobalSymbols())
-    for t in self.getTypeDefs(False):
-        normalized.addDef(t.normalize(normalized))
-    return normalized
+    """ Normalize the type definitions in place and return the collection """
+    # Type definitions promoted to the top level by makeField() are appended
+    # to the collection while normalizing, but as they have been normalized
+    # before, only the definitions on the worklist are normalized. Each
+    # promoted definition is placed before the one it has been promoted from.
+    worklist = list(self.getTypeDefs())
+    order = []
+    for t in worklist:
+        nPrevious = len(self.typedefs)
+        normalized = t.normalize(self)
+        if normalized is not t:
+            # t has been replaced (e.g. a dynamic vector by a struct)
+            if self.typedefsByName.get(t.getName()) is t:
+                del self.typedefsByName[t.getName()]
+            self.typedefsByName[normalized.getName()] = normalized
+            normalized.setParent(self)
+        order += self.typedefs[nPrevious:] + [normalized]
+    self.typedefs = order
+    self.childNames = None
+    self.invalidateScope()
+    TypeDef.invalidateInstantiations()
+    return self
 
 TypeDefCollection.normalize = normalizeTypeDefs
 
@@ -108,7 +123,7 @@ def normalizeStaticVectorDef(self, typedefs):
     if isinstance(vector, InstanceDef):
         # ... then set the opaque field's length accordingly
         if self.getLength() is not None:
-            vector.args['nbytes'] = self.getLength()
+            vector.setArgs({'nbytes': self.getLength()})
 
     return vector
 
@@ -119,15 +134,21 @@ StaticVectorDef.normalize = normalizeStaticVectorDef
 # _____________________________________________________________________________
 #
 
+def makeLengthField(vector, name):
+    """ Return an integer field named <name> for the length of dynamic
+    vector <vector> """
+    width = vector.getNDigits(vector.getLengthMaxValue(), 2)
+    fieldN = InstanceDef('uint{0}'.format(width), name)
+    if vector.getLengthMinValue() != 0:
+        fieldN.setArgs({'min': vector.getLengthMin()})
+    if vector.getLengthMaxValue() != 2**width - 1:
+        fieldN.setArgs({'max': vector.getLengthMax()})
+    return fieldN
+
 def normalizeDynamicVectorDef(self, typedefs):
 
     # create and configure integer field for vector length
-    width = self.getNDigits(self.getLengthMaxValue(), 2)
-    fieldN = InstanceDef('uint{0}'.format(width), '_N')
-    if self.getLengthMinValue() != 0:
-        fieldN.args['min'] = self.getLengthMin()
-    if self.getLengthMaxValue() != 2**width - 1:
-        fieldN.args['max'] = self.getLengthMax()
+    fieldN = makeLengthField(self, '_N')
 
     vector = VectorDef.normalize(self, typedefs)
 
@@ -135,7 +156,7 @@ def normalizeDynamicVectorDef(self, typedefs):
     # field in the course of the canonicalization ...
     if isinstance(vector, InstanceDef):
         # ... then set the opaque field's length accordingly
-        vector.args['nbytes'] = IntSymbol('_N')
+        vector.setArgs({'nbytes': IntSymbol('_N')})
     else:
         staticVector = StaticVectorDef(IntSymbol('_N'), \
                 isItemBased=vector.isItemBased)
@@ -155,6 +176,65 @@ def normalizeDynamicVectorDef(self, typedefs):
 DynamicVectorDef.normalize = normalizeDynamicVectorDef
 
 
+#
+# _____________________________________________________________________________
+#
+
+def inlineStructVectors(struct):
+    # name anonymous members as normalizeStructDef() would, as their default
+    # names depend on their indices
+    for i, t in enumerate(struct.getMembers()):
+        if not t.getName():
+            t.setName('_M{0}'.format(i))
+    names = struct.getChildNames()
+    members = []
+    for m in struct.getMembers():
+        if not isinstance(m, DynamicVectorDef) or m.getFlags() \
+                or m.getSize():
+            members += [m]
+            continue
+        lengthName = '_N_{0}'.format(m.getName())
+        if lengthName in names:
+            raise TPLError(('Cannot inline vector "{0}" of struct "{1}" as '
+                    'the name of its length field "{2}" is already taken') \
+                    .format(m.getName(), struct.getName(), lengthName))
+        names.add(lengthName)
+        vector = StaticVectorDef(IntSymbol(lengthName),
+                isItemBased=m.isItemBased)
+        vector.setName(m.getName())
+        vector.setElement(m.getElement())
+        members += [makeLengthField(m, lengthName), vector]
+    nInlined = len(members) - len(struct.getMembers())
+    if nInlined:
+        struct.resetMembers()
+        struct.addMembers(members)
+    return nInlined
+
+
+def inlineDynamicVectors(self):
+    """ Replace each dynamic vector that is a member of a struct by a field
+    holding the vector's length, followed by a static vector of that length,
+    both embedded in the struct directly. Otherwise, normalization wraps the
+    length field and the vector in a struct of their own, adding a level to
+    the tree of decoded data. The length field of vector <name> is named
+    "_N_<name>", which is reserved for this purpose (a TPLError is raised if
+    the struct already has a member of that name). As the length becomes a
+    member of the struct, the features extracted change accordingly (e.g.
+    "<name>/_N" becomes "_N_<name>"). Has to be applied before normalization.
+    Return the number of vectors replaced """
+    nInlined = 0
+    nodes = list(self.getTypeDefs())
+    while nodes:
+        node = nodes.pop()
+        # (case branches need to keep their number of members)
+        if isinstance(node, StructDef) and not isinstance(node, CaseDef):
+            nInlined += inlineStructVectors(node)
+        nodes.extend(node.getChildren())
+    return nInlined
+
+TypeDefCollection.inlineVectors = inlineDynamicVectors
+
+
 #
 # _____________________________________________________________________________
 #
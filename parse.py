@@ -31,639 +31,228 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-import sys
-import math
-from pyparsing import *
+import re
+import bisect
+import hashlib
 from core import *
+import snapshot
+from compilecache import getToolVersion
 
 # TODO: Allow setting configuration parameters, e.g. min-data-size = 8 bit
 # TODO: Allow sourcing other TPL files from TPL file
 
 
 class EtplParseException(Exception):
+    """
+    Syntax error raised by the parser backends, wrapping an <error> giving
+    the text parsed (pstr), the error's position therein (loc), and a
+    message (msg)
+    """
 
     def __init__(self, error):
         self.error = error
 
 
-def failHard(s, l, expr, err):
-    raise EtplParseException(err)
+class LineIndex(object):
+    """
+    Table of the offsets at which the lines of a text start, allowing to map
+    positions in the text to line and column numbers (both starting at 1)
+    """
 
+    def __init__(self, text):
+        self.text = text
+        self.lineStarts = [0] + [m.end() for m in re.finditer('\n', text)]
 
-def getLineNumber(text, pos):
-    return text.count('\n', 0, pos) + 1
-
-# _____________________________________________________________________________
-
-def Block(par, body, name=None):
-    block = Suppress(Literal(par[0])) + body + Suppress(Literal(par[1]))
-    if name:
-        block.setName(name)
-    return block
-
-def CommaSeparatedList(expression):
-    return expression + ZeroOrMore(Suppress(Literal(",")) - expression)
-
-# _____
-
-pypLineTerm = Suppress(Literal(";"))
-
-pypKeywordExtern      = Keyword("extern")
-pypKeywordOptional      = Keyword("optional")
-pypKeywordDistinctive   = Keyword("distinctive")    # mark element in struct as the one defining an instance's distinctive type
-
-pypKeywordExported      = Keyword("exported")       # export value of element
-
-pypKeywordConst     = Keyword("const")
-
-pypKeywordStruct    = Keyword("struct")
-
-pypKeywordEnum      = Keyword("enum")
-
-pypKeywordFlags     = Keyword("flags")
-
-pypKeywordSelect    = Keyword("select")
-pypKeywordCase      = Keyword("case")
-pypKeywordDefault   = Keyword("default")
-
-pypKeywordBits      = Keyword("bits")
-pypKeywordBytes     = Keyword("bytes")
-
-pypReserved = NotAny(
-    pypKeywordExtern |
-    pypKeywordOptional |
-    pypKeywordConst | 
-    pypKeywordStruct | 
-    pypKeywordEnum | 
-    pypKeywordFlags | 
-    pypKeywordSelect |
-    pypKeywordCase |
-    pypKeywordDefault |
-    pypKeywordBits |
-    pypKeywordBytes)
-
-
-# _____
-
-# -----------------------------------------------------------------------------
-# EBNF: UnqualifiedIdentifier = ...
-# -----------------------------------------------------------------------------
-pypUnqualifiedIdentifier = pypReserved + Word(alphas, alphanums + "_")
-
-def get_pypUnqualifiedIdentifier(name):
-    return pypReserved + Word(alphas, alphanums + "_").setName(name)
-
-
-
-pypIdentifierList = Group(delimitedList(pypUnqualifiedIdentifier))
-
-
-# _____________________________________________________________________________
-#
-# Integer expressions and ranges
-# _____________________________________________________________________________
-
-# -----------------------------------------------------------------------------
-# EBNF: HexIntLiteral = ("0x" | "0X"), HexDigits;
-# -----------------------------------------------------------------------------
-pypHexIntLiteral = \
-        CaselessLiteral("0x") \
-        - Word(hexnums).setName('hex digits')
-
-pypHexIntLiteral.setParseAction(lambda s, l, t: IntLiteral(int(t[1], 16)))
-
-
-# -----------------------------------------------------------------------------
-# EBNF: BinIntLiteral = ("0b" | "0B"), BinDigits;
-# -----------------------------------------------------------------------------
-pypBinIntLiteral = \
-        CaselessLiteral("0b") \
-        - Word('01').setName('binary digits')
-
-pypBinIntLiteral.setParseAction(lambda s, l, t: IntLiteral(int(t[1], 2)))
-
-
-# -----------------------------------------------------------------------------
-# EBNF: DecIntLiteral = DecDigits;
-# -----------------------------------------------------------------------------
-pypDecIntLiteral = Word(nums)
-
-pypDecIntLiteral.setParseAction(lambda s, l, t: IntLiteral(int(t[0])))
-
-
-# -----------------------------------------------------------------------------
-# EBNF: IntLiteral = HexIntLiteral | BinIntLiteral | DecIntLiteral;
-# -----------------------------------------------------------------------------
-pypIntLiteral = pypHexIntLiteral | pypBinIntLiteral | pypDecIntLiteral
-
-
-# -----------------------------------------------------------------------------
-# EBNF: IntSymbol = Identifier;
-# -----------------------------------------------------------------------------
-pypIntSymbol = get_pypUnqualifiedIdentifier('integer symbol')
-
-pypIntSymbol.setParseAction(lambda s, l, t: IntSymbol(t[0]))
-
-
-# -----------------------------------------------------------------------------
-# EBNF: ;
-# -----------------------------------------------------------------------------
-pypOpExp    = Literal('^')
-pypOpMult   = Literal('*')
-pypOpPlus   = Literal('+')
-pypOpMinus  = Literal('-')
-
-pypIntExpr = operatorPrecedence(pypIntSymbol | pypIntLiteral, [
-    (pypOpExp, 2, opAssoc.RIGHT,
-        lambda s, l, t: reduce(lambda x, y: x ** y, t[0][0::2])),
-    (pypOpMult, 2, opAssoc.LEFT,
-        lambda s, l, t: reduce(lambda x, y: x * y, t[0][0::2])),
-    (pypOpPlus, 2, opAssoc.LEFT,
-        lambda s, l, t: reduce(lambda x, y: x + y, t[0][0::2])),
-    (pypOpMinus, 2, opAssoc.LEFT,
-        lambda s, l, t: reduce(lambda x, y: x - y, t[0][0::2]))])
-
-pypConstIntExpr = operatorPrecedence(pypIntLiteral, [
-    (pypOpExp, 2, opAssoc.RIGHT,
-        lambda s, l, t: reduce(lambda x, y: x ** y, t[0][0::2])),
-    (pypOpMult, 2, opAssoc.LEFT,
-        lambda s, l, t: reduce(lambda x, y: x * y, t[0][0::2])),
-    (pypOpPlus, 2, opAssoc.LEFT,
-        lambda s, l, t: reduce(lambda x, y: x + y, t[0][0::2])),
-    (pypOpMinus, 2, opAssoc.LEFT,
-        lambda s, l, t: reduce(lambda x, y: x - y, t[0][0::2]))])
-
-# _____
-
-pypIntRange = pypIntExpr - Suppress(Literal("..")) - pypIntExpr
-
-pypIntExprOrRange = pypIntExpr + Optional(Suppress(Literal("..")) - pypIntExpr)
-
-pypConstIntExprOrRange = pypConstIntExpr + \
-        Optional(Suppress(Literal("..")) - pypConstIntExpr)
-
-# _____
-
-#pypTypeDefs = Forward()
-
-
-# _____________________________________________________________________________
-#
-# struct
-# _____________________________________________________________________________
-
-pypStructVarDefs = Forward()
-
-pypStruct = Suppress(pypKeywordStruct) - Block('{}', pypStructVarDefs)
-pypStruct.setParseAction(lambda s, l, t: StructDef(t))
-
-
-# _____________________________________________________________________________
-#
-# Enum
-# _____________________________________________________________________________
-
-# -----------------------------------------------------------------------------
-# EBNF: EnumItemCode = IntLiteralOrRange;
-# -----------------------------------------------------------------------------
-pypEnumItemCode = Literal('*') | pypConstIntExprOrRange
-
-pypEnumItemCode.setName('enumeration item code')
-
-
-# -----------------------------------------------------------------------------
-# EBNF: EnumItemIdentifier = Identifier;
-# -----------------------------------------------------------------------------
-pypEnumItemIdentifier = get_pypUnqualifiedIdentifier('enumeration item name')
-
-
-# -----------------------------------------------------------------------------
-# EBNF: 
-# -----------------------------------------------------------------------------
-pypEnumItem = Optional(pypEnumItemIdentifier) - Block('()', pypEnumItemCode)
-
-def parseEnumItem(s, l, t):
-    #print(t)
-
-    if isinstance(t[-1], str) and t[-1] == '*':
-        if len(t) == 1:
-            # >>> anonymous fallback item >>>
-            return EnumItemFallback(None)
-        elif isinstance(t[0], str) and len(t) == 2:
-            # >>> named fallback item >>>
-            return EnumItemFallback(t[0])
-        else:
-            raise Exception('Should never happen')         
-    elif isinstance(t[0], str):
-        # >>> named enum item >>>
-        return EnumItem(t[0], t[1], t[-1])
-    else:
-        # >>> anonymous enum item >>>
-        return EnumItem(None, t[0], t[-1])
-
-pypEnumItem.setParseAction(parseEnumItem)
-
-pypEnumItem.setFailAction(failHard)
-
-
-# -----------------------------------------------------------------------------
-# EBNF: EnumBody = EnumItem, { ",", EnumItem };
-# -----------------------------------------------------------------------------
-pypEnumBody = CommaSeparatedList(pypEnumItem)
-
-
-# -----------------------------------------------------------------------------
-# EBNF: 
-# -----------------------------------------------------------------------------
-pypEnum = Suppress(pypKeywordEnum) - Block('{}', pypEnumBody)
-
-pypEnum.setParseAction(lambda s, l, t: EnumDef(t))
-
-
-# _____________________________________________________________________________
-#
-# Data Size Unit Definitions
-# _____________________________________________________________________________
-
-pypKeywordBits.setParseAction(lambda s, l, t: SizeDef(None, 1))
-pypKeywordBytes.setParseAction(lambda s, l, t: SizeDef(None, 8))
-
-pypSizeUnit = pypKeywordBits | pypKeywordBytes
-
-pypSizeUnitDef = Literal(":") - pypSizeUnit
-pypSizeUnitDef.setParseAction(lambda s, l, t: t[1])
-
-
-# _____________________________________________________________________________
-#
-# Vectors
-# _____________________________________________________________________________
-
-pypVectorLength = pypIntExpr
-
-pypVector1  = Literal("[").setParseAction(lambda s, l, t:
-                StaticVectorDef(isItemBased=False)) \
-            - Optional(pypVectorLength - Optional(pypSizeUnitDef)) \
-            - Suppress(Literal("]"))
-
-pypVector2  = Literal("[[").setParseAction(lambda s, l, t:
-                StaticVectorDef(isItemBased=True)) \
-            - Optional(pypVectorLength) \
-            - Suppress(Literal("]]"))
+    def getLineNumber(self, pos):
+        return bisect.bisect_right(self.lineStarts, pos)
 
-pypVector = pypVector2 | pypVector1
+    def getColumn(self, pos):
+        return pos - self.lineStarts[self.getLineNumber(pos) - 1] + 1
 
-def parseVector(s, l, t):
-    if len(t) >= 2:
-        t[0].length = t[1]
-        if isinstance(t[1], IntSymbol):
-            t[0].bindings['length'] = t[1].getName()
-    # add unit of length if one has been specified
-    if len(t) >= 3:
-        t[0].lengthUnit = t[2]
-    return t[0]
+    def getLineAndColumn(self, pos):
+        lineNo = self.getLineNumber(pos)
+        return lineNo, pos - self.lineStarts[lineNo - 1] + 1
 
-pypVector.setParseAction(parseVector)
+    def getLine(self, lineNo):
+        """ Return the text of line <lineNo> (without line break) """
+        start = self.lineStarts[lineNo - 1]
+        end = self.lineStarts[lineNo] - 1 \
+                if lineNo < len(self.lineStarts) else len(self.text)
+        return self.text[start:end]
 
-# _____
 
-pypSelfContVector1  = Literal("<").setParseAction(lambda s, l, t:
-                        DynamicVectorDef(isItemBased=False)) \
-                    - pypIntExprOrRange \
-                    - Optional(pypSizeUnitDef) \
-                    - Suppress(Literal(">"))
+# the index of the text parsed most recently
+lastLineIndex = None
 
-pypSelfContVector2  = Literal("<<").setParseAction(lambda s, l, t:
-                        DynamicVectorDef(isItemBased=True)) \
-                    - pypIntExprOrRange \
-                    - Suppress(Literal(">>"))
+def getLineIndex(text):
+    global lastLineIndex
+    if lastLineIndex is None or lastLineIndex.text is not text:
+        lastLineIndex = LineIndex(text)
+    return lastLineIndex
 
-pypSelfContVector = pypSelfContVector2 | pypSelfContVector1
 
-def parseSelfContVector(s, l, t):
-    indexLen = sum([1 if isinstance(i, IntElement) else 0 for i in t])
-    if indexLen == 1:
-        t[0].lengthMin = IntLiteral(0)
-        t[0].lengthMax = t[1]
-    elif indexLen == 2:
-        t[0].lengthMin = t[1]
-        t[0].lengthMax = t[2]
-    else:
-        raise Exception('Invalid index range for vector')
-    # add unit of length if one has been specified
-    if isinstance(t[-1], SizeDef):
-        t[0].lengthUnit = t[-1]
-    return t[0]
-
-pypSelfContVector.setParseAction(parseSelfContVector)
-
-# _____
-
-pypVectorDef = pypVector | pypSelfContVector
-
-
-# _____________________________________________________________________________
-#
-# Select/Case
-# _____________________________________________________________________________
-
-pypCase = pypKeywordCase \
-        - pypIdentifierList \
-        - Suppress(Literal(":")) \
-        - pypStructVarDefs
-pypCase.setParseAction(lambda s, l, t: CaseDef(t[1], t[2:]))
-
-
-pypDefaultCase  = pypKeywordDefault \
-                - Suppress(Literal(":")) \
-                - pypStructVarDefs
-pypDefaultCase.setParseAction(lambda s, l, t: DefaultCaseDef(t[1:]))
-
-pypCases = ZeroOrMore(pypCase) + Optional(pypDefaultCase)
-
-pypSelectTest = get_pypUnqualifiedIdentifier('variant selector')
-
-pypSelect = pypKeywordSelect - Block('()', pypSelectTest) - Block('{}', pypCases)
-# t[1] is the test expression (-> test symbol name)
-# t[2:] is the list of case branches
-pypSelect.setParseAction(lambda s, l, t: SelectDef(t[1], t[2:]))
-
-
-# _____________________________________________________________________________
-#
-# Size
-# _____________________________________________________________________________
-
-pypSize = pypIntExpr | pypUnqualifiedIdentifier
-
-pypSizeDef  = Suppress(Literal('(')) \
-            - pypSize \
-            - Optional(pypSizeUnitDef) \
-            - Suppress(Literal(')'))
-
-def parseSizeDef(s, l, t):
-    if len(t) == 2:
-        size = t[1]
-        size.setSize(t[0])
-    else:
-        size = SizeDef(t[0])
-    return size
-
-pypSizeDef.setParseAction(parseSizeDef)
-
-
-# _____________________________________________________________________________
-#
-# Type Parametrization
-# _____________________________________________________________________________
-
-# -----------------------------------------------------------------------------
-# EBNF: 
-# -----------------------------------------------------------------------------
-pypTypeParameterName = get_pypUnqualifiedIdentifier('parameter name')
-
-
-# -----------------------------------------------------------------------------
-# EBNF: 
-# -----------------------------------------------------------------------------
-pypTypeParameterValue = pypIntExpr | Word(alphas, alphanums + "_")
-
-pypTypeParameterValue.setName('parameter value')
-
-
-# -----------------------------------------------------------------------------
-# EBNF: TypeParameterChoice = TypeParameterName, "=", TypeParameterValue;
-# -----------------------------------------------------------------------------
-pypTypeParameterChoice = \
-        pypTypeParameterName \
-        - Suppress(Literal('=')) \
-        - pypTypeParameterValue
-
-pypTypeParameterChoice.setParseAction(lambda s, l, t: {t[0]: t[1]})
-
-
-# -----------------------------------------------------------------------------
-# EBNF: TypeParameterChoiceList =
-#               "<", TypeParameterChoice, { (",", TypeParameterChoice) }, ">";
-# -----------------------------------------------------------------------------
-pypTypeParameterChoiceList = \
-        Suppress(Literal('<')) \
-        - pypTypeParameterChoice \
-        + ZeroOrMore(Suppress(Literal(",")) - pypTypeParameterChoice) \
-        - Suppress(Literal('>'))
-
-pypTypeParameterChoiceList.setParseAction(lambda s, l, t: reduce( \
-        lambda x, y: InstanceDef.mergeArgsDisjunct(x, y), t))
-
-pypTypeParameterChoiceList.setFailAction(failHard)
-
-
-# -----------------------------------------------------------------------------
-# EBNF: TypeParametrization = "::", TypeParameterChoiceList;
-# -----------------------------------------------------------------------------
-pypTypeParametrization = Suppress(Literal('::')) - pypTypeParameterChoiceList
-
-pypTypeParametrization.setParseAction(lambda s, l, t: \
-        reduce(lambda x, y: InstanceDef.mergeArgsDisjunct(x, y), t));
-
-# _____________________________________________________________________________
-#
-# Constdefs
-# _____________________________________________________________________________
-
-pypConstIntSymbolName = get_pypUnqualifiedIdentifier('symbol name')
-
-pypConstIntSymbolDef = Suppress(pypKeywordConst) \
-            - pypConstIntSymbolName \
-            - Suppress(Literal('=')) \
-            - pypIntExpr \
-            - pypLineTerm \
-
-pypConstIntSymbolDef.setParseAction(lambda s, l, t: ConstDef(t[0], t[1]))
+def getLineNumber(text, pos):
+    return getLineIndex(text).getLineNumber(pos)
 
 
-# _____________________________________________________________________________
 #
-# Typedefs
-# _____________________________________________________________________________
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypTypeAliasTypeName = get_pypUnqualifiedIdentifier('type alias type name')
-
-pypTypeAliasTypeName.setParseAction(lambda s, l, t: InstanceDef(t[0]))
-
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypTypeAlias = pypTypeAliasTypeName + Optional(pypTypeParametrization)
-
-def parseParametrizedTypeName(s, l, t):
-    if len(t) > 1:
-        t[0].setArgs(t[1])
-    return t[0]
-    
-pypTypeAlias.setParseAction(parseParametrizedTypeName);
-
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypType = pypStruct ^ pypEnum ^ pypTypeAlias
-
-# Don't allow two size definitions follow each other
-pypVectorOrSizeDef = pypVectorDef | (pypSizeDef + ~FollowedBy(pypSizeDef))
-
-pypTypeExtensions   = ZeroOrMore(pypVectorOrSizeDef)
-
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypTypeDefName = get_pypUnqualifiedIdentifier('type name')
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypTypeDef  = pypType \
-            - pypTypeDefName \
-            - pypTypeExtensions \
-            - pypLineTerm
-
-def parseTypeDef(s, l, t):
-
-    # the type
-    var = t[0]
-
-    # definition name
-    var.name = t[1]
-
-    # vectors, wrappers, etc.
-    for e in t[2:]:
-        if isinstance(e, WrapperDef):
-            var = e.embedElement(var)
-        elif isinstance(e, SizeDef):
-            var.setSize(e)
-    var.tplLineNo = getLineNumber(s, l)
-    return var
-
-pypTypeDef.setParseAction(parseTypeDef)
-
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypFile = ZeroOrMore(pypConstIntSymbolDef | pypTypeDef) + stringEnd
-
-pypFile.ignore(cppStyleComment)
-
-
 # _____________________________________________________________________________
 #
-# Struct Vardefs
-# _____________________________________________________________________________
-
-# TODO: Allow extern definitions to give a link, e.g. "extern(../myx) uint8 x;"
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypStructVarQualifier = \
-        pypKeywordExtern | \
-        pypKeywordOptional | \
-        pypKeywordDistinctive
-
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypStructMemberType = get_pypUnqualifiedIdentifier('struct member type')
-
-pypStructMemberType.setParseAction(lambda s, l, t: InstanceDef(t[0]))
-
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypInstance = pypStructMemberType + Optional(pypTypeParametrization)
-
+# Parser backends: the pyparsing grammar in pypgrammar.py and the (faster)
+# recursive-descent parser in rdparse.py, which build the same type
+# definitions. A backend's module is only imported once the backend is used,
+# as importing pypgrammar.py (i.e. building the grammar) takes a noticeable
+# amount of time.
+BACKENDS = ['pyparsing', 'rd']
 
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypStructVarType = pypStruct | pypEnum | pypSelect | pypInstance
+DEFAULT_BACKEND = 'pyparsing'
 
 
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypStructVarTypeExtensions = ZeroOrMore(pypVectorOrSizeDef)
+def getBackend(backend):
+    """ Return the function of parser backend <backend> parsing eTPL source
+    code into a list of (top-level) definitions, raising EtplParseException
+    on syntax errors """
+    if backend == 'pyparsing':
+        import pypgrammar
+        return pypgrammar.parseText
+    elif backend == 'rd':
+        import rdparse
+        return rdparse.parseText
+    raise TPLError('Unknown parser backend "{0}"'.format(backend))
 
 
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypStructMemberName = get_pypUnqualifiedIdentifier('struct member name')
+def parse(text, chunkCache=None, backend=DEFAULT_BACKEND):
 
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypStructVarDef = Optional(pypStructVarQualifier) \
-                + pypStructVarType \
-                - Optional(pypStructMemberName) \
-                - pypStructVarTypeExtensions \
-                - pypLineTerm
-
-def parseStructVarDef(s, l, t):
-    i = (i for i, x in enumerate(t) if isinstance(x, TypeDef)).next()
-    var = t[i]
-    # assign member modifiers
-    if pypKeywordExtern in t[:i]:
-        var.setFlagExtern() 
-    if pypKeywordOptional in t[:i]:
-        var.setFlagOptional()
-    if pypKeywordDistinctive in t[:i]:
-        var.setFlagDistinctive()
-    # assign name if one has been given
-    if len(t) > i + 1 and isinstance(t[i + 1], str):
-        var.name = t[i + 1]
-    # apply vector, size, and fragment definitions
-    for e in t[i + 1:]:
-        if isinstance(e, WrapperDef):
-            var = e.embedElement(var)
-        elif isinstance(e, SizeDef):
-            var.setSize(e)
-    var.tplLineNo = getLineNumber(s, l)
-    return var
-
-pypStructVarDef.setParseAction(parseStructVarDef)
-
-
-# -----------------------------------------------------------------------------
-# EBNF: ... ;
-# -----------------------------------------------------------------------------
-pypStructVarDefs << ZeroOrMore(pypStructVarDef)
+    parseText = getBackend(backend)
+    typedefs = TypeDefCollection()
+    if chunkCache is not None:
+        typedefs.addDefs(parseIncrementally(text, chunkCache, parseText))
+        return typedefs
+    typedefs.addDefs(parseText(text))
+    return typedefs
 
 
 #
 # _____________________________________________________________________________
 #
-def removeComments(text):
-    return '\n'.join(reduce(lambda x, y: x + y,
-        [pypLine.parseString(line).asList() for line in text.split('\n')]))
-
-
+# Incremental parsing: the input is split into chunks of top-level definitions
+# (statements terminated by ';' outside of any braces) and the type definitions
+# parsed from each chunk are cached by the chunk's content. Only chunks not
+# found in the cache are actually parsed.
 #
-# _____________________________________________________________________________
-#
-def parse(text):
 
-    typedefs = TypeDefCollection()
-#    typedefs.addDefs(pypFile.parseString(removeComments(text)).asList())
-    typedefs.addDefs(pypFile.parseString(text).asList())
+pypChunkTokens = re.compile(r'//[^\n]*|/\*.*?\*/|[{};]', re.DOTALL)
+
+
+def splitChunks(text):
+    """ Split <text> into a list of top-level chunks, each given as a tuple
+    of the chunk's text and its first line's number """
+    chunks = []
+    depth = 0
+    start = 0
+    lineNo = 1
+    for match in pypChunkTokens.finditer(text):
+        token = match.group()
+        if token == '{':
+            depth += 1
+        elif token == '}':
+            depth -= 1
+        elif token == ';' and depth == 0:
+            chunks += [(text[start:match.end()], lineNo)]
+            lineNo += text.count('\n', start, match.end())
+            start = match.end()
+    if text[start:].strip():
+        chunks += [(text[start:], lineNo)]
+    return chunks
+
+
+def shiftLineNumbers(typedef, offset):
+    if hasattr(typedef, 'tplLineNo'):
+        typedef.tplLineNo += offset
+    for child in typedef.getChildren():
+        shiftLineNumbers(child, offset)
+
+
+class ChunkCache(object):
+    """
+    Cache of type definitions parsed from chunks of eTPL source code
+    """
+
+    def __init__(self):
+        # maps content hashes of chunks to the snapshot encodings of the
+        # type definitions parsed from them
+        self.chunks = {}
+        self.used = set()
+        self.nHits = 0
+        self.nMisses = 0
+
+    @staticmethod
+    def getChunkHash(chunk):
+        return hashlib.sha1(chunk).hexdigest()
+
+    def get(self, key):
+        """ Return a fresh copy of the type definitions cached for the chunk
+        with content hash <key> or None if there are none """
+        encoded = self.chunks.get(key)
+        if encoded is None:
+            self.nMisses += 1
+            return None
+        classes = snapshot.getNodeClasses()
+        try:
+            typedefs = [snapshot.decode(t, classes) for t in encoded]
+        except Exception:
+            # treat invalid cache contents like a miss
+            del self.chunks[key]
+            self.nMisses += 1
+            return None
+        self.nHits += 1
+        self.used.add(key)
+        return typedefs
+
+    def put(self, key, typedefs):
+        self.chunks[key] = [snapshot.encode(t) for t in typedefs]
+        self.used.add(key)
+
+    def prune(self):
+        """ Remove all chunks not used since the last pruning """
+        self.chunks = {key: self.chunks[key] for key in self.used}
+        self.used = set()
+
+    def dumps(self):
+        """ Return the serialized cache """
+        return snapshot.dumpEncoding(
+                [snapshot.SNAPSHOT_VERSION, getToolVersion(), self.chunks])
+
+    def loads(self, data):
+        """ Add the chunks from the serialized cache <data>, if it has been
+        written by the same version of the tool """
+        try:
+            version, toolVersion, chunks = snapshot.loadEncoding(data)
+        except (ValueError, TypeError):
+            return
+        if version == snapshot.SNAPSHOT_VERSION and \
+                toolVersion == getToolVersion() and isinstance(chunks, dict):
+            self.chunks.update(chunks)
+
+
+def parseIncrementally(text, chunkCache, parseText):
+    typedefs = []
+    for chunk, lineNo in splitChunks(text):
+        key = ChunkCache.getChunkHash(chunk)
+        parsed = chunkCache.get(key)
+        if parsed is None:
+            try:
+                parsed = parseText(chunk)
+            except EtplParseException:
+                # parse the complete text to report the error at the right
+                # position (and also in case the chunks are invalid on their
+                # own, e.g. due to unbalanced braces)
+                return parseText(text)
+            # (the cache keeps a copy with line numbers relative to the chunk)
+            chunkCache.put(key, parsed)
+        for t in parsed:
+            shiftLineNumbers(t, lineNo - 1)
+        typedefs += parsed
     return typedefs    
 
 
@@ -0,0 +1,164 @@
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+#
+# Pass manager for the processing steps following parsing (normalization,
+# removal of unreachable type definitions, deduplication, sorting, ...). Each
+# pass runs on a type definition collection and may require other passes to
+# have run before. Optional passes can be enabled or disabled individually,
+# and the time taken and the objects allocated by each pass are recorded.
+#
+
+import gc
+import time
+from core import *
+
+
+#
+# _____________________________________________________________________________
+#
+
+class Pass(object):
+    """
+    A processing pass named <name>, calling <function> with the type
+    definition collection to process. The passes named in <requires> have to
+    run before this pass if they are enabled. If <report> is given, it is
+    called with the collection and the result of <function> after the pass.
+    """
+
+    def __init__(self, name, function, requires=None, optional=False,
+            enabled=True, report=None):
+        self.name = name
+        self.function = function
+        self.requires = list(requires) if requires else []
+        self.optional = optional
+        self.enabled = enabled
+        self.report = report
+
+
+class PassStats(object):
+    """
+    Time taken (in seconds) by and net number of objects allocated by a pass
+    (None if not measured)
+    """
+
+    def __init__(self, name, duration, nObjects=None):
+        self.name = name
+        self.duration = duration
+        self.nObjects = nObjects
+
+
+class PassManager(object):
+
+    def __init__(self):
+        self.passes = []
+        self.passesByName = {}
+        self.stats = []
+
+    def register(self, name, function, requires=None, optional=False,
+            enabled=True, report=None):
+        """ Add a pass to run after the ones already registered (see Pass for
+        the arguments). All passes it requires must already be registered. """
+        if name in self.passesByName:
+            raise TPLError('Pass "{0}" already exists'.format(name))
+        for required in requires or []:
+            self.getPass(required)
+        newPass = Pass(name, function, requires, optional, enabled, report)
+        self.passes += [newPass]
+        self.passesByName[name] = newPass
+        return newPass
+
+    def getPass(self, name):
+        if name not in self.passesByName:
+            raise TPLError('Unknown pass "{0}"'.format(name))
+        return self.passesByName[name]
+
+    def getPasses(self):
+        return self.passes
+
+    def enable(self, name):
+        self.getPass(name).enabled = True
+
+    def disable(self, name):
+        p = self.getPass(name)
+        if not p.optional:
+            raise TPLError('Pass "{0}" cannot be disabled'.format(name))
+        p.enabled = False
+
+    def getEnabledPassNames(self):
+        return [p.name for p in self.passes if p.enabled]
+
+    def getSchedule(self):
+        """ Return the list of enabled passes in the order to run them """
+        schedule = [p for p in self.passes if p.enabled]
+        for p in schedule:
+            for required in p.requires:
+                if not self.passesByName[required].enabled:
+                    raise TPLError('Pass "{0}" requires disabled pass "{1}"' \
+                            .format(p.name, required))
+        return schedule
+
+    def run(self, typedefs, measureObjects=False):
+        """ Run all enabled passes on the type definition collection
+        <typedefs>. If <measureObjects> is True, also count the objects
+        allocated by each pass (which takes considerable extra time) """
+        self.stats = []
+        for p in self.getSchedule():
+            if measureObjects:
+                gc.collect()
+                nObjects = len(gc.get_objects())
+            start = time.time()
+            result = p.function(typedefs)
+            duration = time.time() - start
+            if measureObjects:
+                gc.collect()
+                nObjects = len(gc.get_objects()) - nObjects
+            self.stats += [PassStats(p.name, duration,
+                    nObjects if measureObjects else None)]
+            if p.report:
+                p.report(typedefs, result)
+
+    def getStats(self):
+        """ Return the statistics of the passes run last """
+        return self.stats
+
+    def getStatsStr(self):
+        lines = ['{0:<16} {1:>10} {2:>10}'.format('Pass', 'time [ms]',
+                'objects')]
+        for s in self.stats:
+            lines += ['{0:<16} {1:>10.1f} {2:>10}'.format(s.name,
+                    s.duration * 1e3,
+                    '{0:+d}'.format(s.nObjects) if s.nObjects is not None \
+                            else '-')]
+        return '\n'.join(lines)
@@ -0,0 +1,705 @@
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+#
+# The pyparsing grammar for eTPL, i.e. the default parser backend (see
+# parse.py). The grammar is built when this module is imported.
+#
+
+import re
+from pyparsing import *
+from core import *
+from parse import EtplParseException, getLineNumber
+
+
+def failHard(s, l, expr, err):
+    raise EtplParseException(err)
+
+
+# _____________________________________________________________________________
+
+def Block(par, body, name=None):
+    block = Suppress(Literal(par[0])) + body + Suppress(Literal(par[1]))
+    if name:
+        block.setName(name)
+    return block
+
+def CommaSeparatedList(expression):
+    return expression + ZeroOrMore(Suppress(Literal(",")) - expression)
+
+# _____
+
+pypLineTerm = Suppress(Literal(";"))
+
+pypKeywordExtern      = Keyword("extern")
+pypKeywordOptional      = Keyword("optional")
+pypKeywordDistinctive   = Keyword("distinctive")    # mark element in struct as the one defining an instance's distinctive type
+
+pypKeywordExported      = Keyword("exported")       # export value of element
+
+pypKeywordConst     = Keyword("const")
+
+pypKeywordStruct    = Keyword("struct")
+
+pypKeywordEnum      = Keyword("enum")
+
+pypKeywordFlags     = Keyword("flags")
+
+pypKeywordSelect    = Keyword("select")
+pypKeywordCase      = Keyword("case")
+pypKeywordDefault   = Keyword("default")
+
+pypKeywordBits      = Keyword("bits")
+pypKeywordBytes     = Keyword("bytes")
+
+pypReserved = NotAny(
+    pypKeywordExtern |
+    pypKeywordOptional |
+    pypKeywordConst | 
+    pypKeywordStruct | 
+    pypKeywordEnum | 
+    pypKeywordFlags | 
+    pypKeywordSelect |
+    pypKeywordCase |
+    pypKeywordDefault |
+    pypKeywordBits |
+    pypKeywordBytes)
+
+
+# _____
+
+# -----------------------------------------------------------------------------
+# EBNF: UnqualifiedIdentifier = ...
+# -----------------------------------------------------------------------------
+pypUnqualifiedIdentifier = pypReserved + Word(alphas, alphanums + "_")
+
+def get_pypUnqualifiedIdentifier(name):
+    return pypReserved + Word(alphas, alphanums + "_").setName(name)
+
+
+
+pypIdentifierList = Group(delimitedList(pypUnqualifiedIdentifier))
+
+
+# _____________________________________________________________________________
+#
+# Integer expressions and ranges
+# _____________________________________________________________________________
+
+# -----------------------------------------------------------------------------
+# EBNF: HexIntLiteral = ("0x" | "0X"), HexDigits;
+# EBNF: BinIntLiteral = ("0b" | "0B"), BinDigits;
+# EBNF: DecIntLiteral = DecDigits;
+# EBNF: IntLiteral = HexIntLiteral | BinIntLiteral | DecIntLiteral;
+# EBNF: IntSymbol = Identifier;
+# EBNF: IntOperand = IntSymbol | IntLiteral | "(", IntExpr, ")";
+# EBNF: IntExpr = IntOperand, { ("^" | "*" | "+" | "-"), IntOperand };
+# -----------------------------------------------------------------------------
+
+class IntExpression(Token):
+    """
+    Integer expressions made of integer literals, integer symbols (unless
+    restricted to constant expressions), parentheses, and the binary operators
+    "^" (right-associative), "*", "+", and "-" (left-associative), given in
+    decreasing order of precedence. Parsed by precedence climbing as a single
+    token, resulting in an IntLiteral or IntSymbol.
+    """
+
+    # operator -> (precedence, right-associative, operation)
+    operators = {
+        '^': (3, True, lambda x, y: x ** y),
+        '*': (2, False, lambda x, y: x * y),
+        '+': (1, False, lambda x, y: x + y),
+        '-': (0, False, lambda x, y: x - y)
+    }
+
+    reSkip = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+    reHexLiteral = re.compile(r'0[xX]\s*([0-9a-fA-F]*)')
+    reBinLiteral = re.compile(r'0[bB]\s*([01]*)')
+    reDecLiteral = re.compile(r'[0-9]+')
+    reSymbol = re.compile(r'[a-zA-Z][a-zA-Z0-9_]*')
+
+    reservedWords = frozenset(['extern', 'optional', 'const', 'struct', 'enum',
+            'flags', 'select', 'case', 'default', 'bits', 'bytes'])
+
+    def __init__(self, allowSymbols=True):
+        Token.__init__(self)
+        self.allowSymbols = allowSymbols
+        self.name = 'integer expression' if allowSymbols \
+                else 'constant integer expression'
+        self.errmsg = 'Expected ' + self.name
+        self.mayReturnEmpty = False
+        self.mayIndexError = False
+
+    def skip(self, instring, loc):
+        return IntExpression.reSkip.match(instring, loc).end()
+
+    def parseOperand(self, instring, loc):
+        loc = self.skip(instring, loc)
+        if instring.startswith('(', loc):
+            tree, loc = self.parseExpression(instring, loc + 1, 0)
+            loc = self.skip(instring, loc)
+            if not instring.startswith(')', loc):
+                raise ParseException(instring, loc, 'Expected ")"', self)
+            return tree, loc + 1
+        for regex, base in [(IntExpression.reHexLiteral, 16),
+                (IntExpression.reBinLiteral, 2)]:
+            match = regex.match(instring, loc)
+            if match:
+                if not match.group(1):
+                    # there is no way back once the prefix has been matched
+                    raise ParseSyntaxException(instring, match.end(),
+                            'Expected {0} digits'.format(
+                                    'hex' if base == 16 else 'binary'), self)
+                return IntLiteral(int(match.group(1), base)), match.end()
+        match = IntExpression.reDecLiteral.match(instring, loc)
+        if match:
+            return IntLiteral(int(match.group())), match.end()
+        match = IntExpression.reSymbol.match(instring, loc) \
+                if self.allowSymbols else None
+        if match and match.group() not in IntExpression.reservedWords:
+            return IntSymbol(match.group()), match.end()
+        raise ParseException(instring, loc, self.errmsg, self)
+
+    def parseExpression(self, instring, loc, minPrecedence):
+        """
+        Returns the expression's syntax tree made of operands and
+        (<operation>, <lhs>, <rhs>) tuples, and the location following it.
+        """
+        tree, loc = self.parseOperand(instring, loc)
+        while True:
+            opLoc = self.skip(instring, loc)
+            operator = IntExpression.operators.get(instring[opLoc:opLoc + 1])
+            if operator is None or operator[0] < minPrecedence:
+                return tree, loc
+            precedence, rightAssoc, operation = operator
+            try:
+                rhs, loc = self.parseExpression(instring, opLoc + 1,
+                        precedence if rightAssoc else precedence + 1)
+            except ParseBaseException:
+                # no valid operand following the operator: the expression
+                # ends right before the operator
+                return tree, loc
+            tree = (operation, tree, rhs)
+
+    def evaluate(self, tree):
+        if not isinstance(tree, tuple):
+            return tree
+        operation, lhs, rhs = tree
+        return operation(self.evaluate(lhs), self.evaluate(rhs))
+
+    def parseImpl(self, instring, loc, doActions=True):
+        # operations are only applied once the whole expression has been
+        # matched, so that no operation is applied to a discarded operand
+        tree, loc = self.parseExpression(instring, loc, 0)
+        return loc, self.evaluate(tree) if doActions else tree
+
+
+pypIntExpr = IntExpression()
+
+pypConstIntExpr = IntExpression(allowSymbols=False)
+
+# _____
+
+pypIntRange = pypIntExpr - Suppress(Literal("..")) - pypIntExpr
+
+pypIntExprOrRange = pypIntExpr + Optional(Suppress(Literal("..")) - pypIntExpr)
+
+pypConstIntExprOrRange = pypConstIntExpr + \
+        Optional(Suppress(Literal("..")) - pypConstIntExpr)
+
+# _____
+
+#pypTypeDefs = Forward()
+
+
+# _____________________________________________________________________________
+#
+# struct
+# _____________________________________________________________________________
+
+pypStructVarDefs = Forward()
+
+pypStruct = Suppress(pypKeywordStruct) - Block('{}', pypStructVarDefs)
+pypStruct.setParseAction(lambda s, l, t: StructDef(t))
+
+
+# _____________________________________________________________________________
+#
+# Enum
+# _____________________________________________________________________________
+
+# -----------------------------------------------------------------------------
+# EBNF: EnumItemCode = IntLiteralOrRange;
+# -----------------------------------------------------------------------------
+pypEnumItemCode = Literal('*') | pypConstIntExprOrRange
+
+pypEnumItemCode.setName('enumeration item code')
+
+
+# -----------------------------------------------------------------------------
+# EBNF: EnumItemIdentifier = Identifier;
+# -----------------------------------------------------------------------------
+pypEnumItemIdentifier = get_pypUnqualifiedIdentifier('enumeration item name')
+
+
+# -----------------------------------------------------------------------------
+# EBNF: 
+# -----------------------------------------------------------------------------
+pypEnumItem = Optional(pypEnumItemIdentifier) - Block('()', pypEnumItemCode)
+
+def parseEnumItem(s, l, t):
+    #print(t)
+
+    if isinstance(t[-1], str) and t[-1] == '*':
+        if len(t) == 1:
+            # >>> anonymous fallback item >>>
+            return EnumItemFallback(None)
+        elif isinstance(t[0], str) and len(t) == 2:
+            # >>> named fallback item >>>
+            return EnumItemFallback(t[0])
+        else:
+            raise Exception('Should never happen')         
+    elif isinstance(t[0], str):
+        # >>> named enum item >>>
+        return EnumItem(t[0], t[1], t[-1])
+    else:
+        # >>> anonymous enum item >>>
+        return EnumItem(None, t[0], t[-1])
+
+pypEnumItem.setParseAction(parseEnumItem)
+
+pypEnumItem.setFailAction(failHard)
+
+
+# -----------------------------------------------------------------------------
+# EBNF: EnumBody = EnumItem, { ",", EnumItem };
+# -----------------------------------------------------------------------------
+pypEnumBody = CommaSeparatedList(pypEnumItem)
+
+
+# -----------------------------------------------------------------------------
+# EBNF: 
+# -----------------------------------------------------------------------------
+pypEnum = Suppress(pypKeywordEnum) - Block('{}', pypEnumBody)
+
+pypEnum.setParseAction(lambda s, l, t: EnumDef(t))
+
+
+# _____________________________________________________________________________
+#
+# Data Size Unit Definitions
+# _____________________________________________________________________________
+
+pypKeywordBits.setParseAction(lambda s, l, t: SizeDef(None, 1))
+pypKeywordBytes.setParseAction(lambda s, l, t: SizeDef(None, 8))
+
+pypSizeUnit = pypKeywordBits | pypKeywordBytes
+
+pypSizeUnitDef = Literal(":") - pypSizeUnit
+pypSizeUnitDef.setParseAction(lambda s, l, t: t[1])
+
+
+# _____________________________________________________________________________
+#
+# Vectors
+# _____________________________________________________________________________
+
+pypVectorLength = pypIntExpr
+
+pypVector1  = Literal("[").setParseAction(lambda s, l, t:
+                StaticVectorDef(isItemBased=False)) \
+            - Optional(pypVectorLength - Optional(pypSizeUnitDef)) \
+            - Suppress(Literal("]"))
+
+pypVector2  = Literal("[[").setParseAction(lambda s, l, t:
+                StaticVectorDef(isItemBased=True)) \
+            - Optional(pypVectorLength) \
+            - Suppress(Literal("]]"))
+
+pypVector = pypVector2 | pypVector1
+
+def parseVector(s, l, t):
+    if len(t) >= 2:
+        t[0].setLength(t[1])
+        if isinstance(t[1], IntSymbol):
+            t[0].setBinding('length', t[1].getName())
+    # add unit of length if one has been specified
+    if len(t) >= 3:
+        t[0].lengthUnit = t[2]
+    return t[0]
+
+pypVector.setParseAction(parseVector)
+
+# _____
+
+pypSelfContVector1  = Literal("<").setParseAction(lambda s, l, t:
+                        DynamicVectorDef(isItemBased=False)) \
+                    - pypIntExprOrRange \
+                    - Optional(pypSizeUnitDef) \
+                    - Suppress(Literal(">"))
+
+pypSelfContVector2  = Literal("<<").setParseAction(lambda s, l, t:
+                        DynamicVectorDef(isItemBased=True)) \
+                    - pypIntExprOrRange \
+                    - Suppress(Literal(">>"))
+
+pypSelfContVector = pypSelfContVector2 | pypSelfContVector1
+
+def parseSelfContVector(s, l, t):
+    indexLen = sum([1 if isinstance(i, IntElement) else 0 for i in t])
+    if indexLen == 1:
+        t[0].lengthMin = IntLiteral(0)
+        t[0].lengthMax = t[1]
+    elif indexLen == 2:
+        t[0].lengthMin = t[1]
+        t[0].lengthMax = t[2]
+    else:
+        raise Exception('Invalid index range for vector')
+    # add unit of length if one has been specified
+    if isinstance(t[-1], SizeDef):
+        t[0].lengthUnit = t[-1]
+    return t[0]
+
+pypSelfContVector.setParseAction(parseSelfContVector)
+
+# _____
+
+pypVectorDef = pypVector | pypSelfContVector
+
+
+# _____________________________________________________________________________
+#
+# Select/Case
+# _____________________________________________________________________________
+
+pypCase = pypKeywordCase \
+        - pypIdentifierList \
+        - Suppress(Literal(":")) \
+        - pypStructVarDefs
+pypCase.setParseAction(lambda s, l, t: CaseDef(t[1], t[2:]))
+
+
+pypDefaultCase  = pypKeywordDefault \
+                - Suppress(Literal(":")) \
+                - pypStructVarDefs
+pypDefaultCase.setParseAction(lambda s, l, t: DefaultCaseDef(t[1:]))
+
+pypCases = ZeroOrMore(pypCase) + Optional(pypDefaultCase)
+
+pypSelectTest = get_pypUnqualifiedIdentifier('variant selector')
+
+pypSelect = pypKeywordSelect - Block('()', pypSelectTest) - Block('{}', pypCases)
+# t[1] is the test expression (-> test symbol name)
+# t[2:] is the list of case branches
+pypSelect.setParseAction(lambda s, l, t: SelectDef(t[1], t[2:]))
+
+
+# _____________________________________________________________________________
+#
+# Size
+# _____________________________________________________________________________
+
+pypSize = pypIntExpr | pypUnqualifiedIdentifier
+
+pypSizeDef  = Suppress(Literal('(')) \
+            - pypSize \
+            - Optional(pypSizeUnitDef) \
+            - Suppress(Literal(')'))
+
+def parseSizeDef(s, l, t):
+    if len(t) == 2:
+        size = t[1]
+        size.setSize(t[0])
+    else:
+        size = SizeDef(t[0])
+    return size
+
+pypSizeDef.setParseAction(parseSizeDef)
+
+
+# _____________________________________________________________________________
+#
+# Type Parametrization
+# _____________________________________________________________________________
+
+# -----------------------------------------------------------------------------
+# EBNF: 
+# -----------------------------------------------------------------------------
+pypTypeParameterName = get_pypUnqualifiedIdentifier('parameter name')
+
+
+# -----------------------------------------------------------------------------
+# EBNF: 
+# -----------------------------------------------------------------------------
+pypTypeParameterValue = pypIntExpr | Word(alphas, alphanums + "_")
+
+pypTypeParameterValue.setName('parameter value')
+
+
+# -----------------------------------------------------------------------------
+# EBNF: TypeParameterChoice = TypeParameterName, "=", TypeParameterValue;
+# -----------------------------------------------------------------------------
+pypTypeParameterChoice = \
+        pypTypeParameterName \
+        - Suppress(Literal('=')) \
+        - pypTypeParameterValue
+
+pypTypeParameterChoice.setParseAction(lambda s, l, t: {t[0]: t[1]})
+
+
+# -----------------------------------------------------------------------------
+# EBNF: TypeParameterChoiceList =
+#               "<", TypeParameterChoice, { (",", TypeParameterChoice) }, ">";
+# -----------------------------------------------------------------------------
+pypTypeParameterChoiceList = \
+        Suppress(Literal('<')) \
+        - pypTypeParameterChoice \
+        + ZeroOrMore(Suppress(Literal(",")) - pypTypeParameterChoice) \
+        - Suppress(Literal('>'))
+
+pypTypeParameterChoiceList.setParseAction(lambda s, l, t: reduce( \
+        lambda x, y: InstanceDef.mergeArgsDisjunct(x, y), t))
+
+pypTypeParameterChoiceList.setFailAction(failHard)
+
+
+# -----------------------------------------------------------------------------
+# EBNF: TypeParametrization = "::", TypeParameterChoiceList;
+# -----------------------------------------------------------------------------
+pypTypeParametrization = Suppress(Literal('::')) - pypTypeParameterChoiceList
+
+pypTypeParametrization.setParseAction(lambda s, l, t: \
+        reduce(lambda x, y: InstanceDef.mergeArgsDisjunct(x, y), t));
+
+# _____________________________________________________________________________
+#
+# Constdefs
+# _____________________________________________________________________________
+
+pypConstIntSymbolName = get_pypUnqualifiedIdentifier('symbol name')
+
+pypConstIntSymbolDef = Suppress(pypKeywordConst) \
+            - pypConstIntSymbolName \
+            - Suppress(Literal('=')) \
+            - pypIntExpr \
+            - pypLineTerm \
+
+pypConstIntSymbolDef.setParseAction(lambda s, l, t: ConstDef(t[0], t[1]))
+
+
+# _____________________________________________________________________________
+#
+# Typedefs
+# _____________________________________________________________________________
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypTypeAliasTypeName = get_pypUnqualifiedIdentifier('type alias type name')
+
+pypTypeAliasTypeName.setParseAction(lambda s, l, t: InstanceDef(t[0]))
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypTypeAlias = pypTypeAliasTypeName + Optional(pypTypeParametrization)
+
+def parseParametrizedTypeName(s, l, t):
+    if len(t) > 1:
+        t[0].setArgs(t[1])
+    return t[0]
+    
+pypTypeAlias.setParseAction(parseParametrizedTypeName);
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypType = pypStruct ^ pypEnum ^ pypTypeAlias
+
+# Don't allow two size definitions follow each other
+pypVectorOrSizeDef = pypVectorDef | (pypSizeDef + ~FollowedBy(pypSizeDef))
+
+pypTypeExtensions   = ZeroOrMore(pypVectorOrSizeDef)
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypTypeDefName = get_pypUnqualifiedIdentifier('type name')
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypTypeDef  = pypType \
+            - pypTypeDefName \
+            - pypTypeExtensions \
+            - pypLineTerm
+
+def parseTypeDef(s, l, t):
+
+    # the type
+    var = t[0]
+
+    # definition name
+    var.name = t[1]
+
+    # vectors, wrappers, etc.
+    for e in t[2:]:
+        if isinstance(e, WrapperDef):
+            var = e.embedElement(var)
+        elif isinstance(e, SizeDef):
+            var.setSize(e)
+    var.tplLineNo = getLineNumber(s, l)
+    return var
+
+pypTypeDef.setParseAction(parseTypeDef)
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypFile = ZeroOrMore(pypConstIntSymbolDef | pypTypeDef) + stringEnd
+
+pypFile.ignore(cppStyleComment)
+
+
+# _____________________________________________________________________________
+#
+# Struct Vardefs
+# _____________________________________________________________________________
+
+# TODO: Allow extern definitions to give a link, e.g. "extern(../myx) uint8 x;"
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypStructVarQualifier = \
+        pypKeywordExtern | \
+        pypKeywordOptional | \
+        pypKeywordDistinctive
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypStructMemberType = get_pypUnqualifiedIdentifier('struct member type')
+
+pypStructMemberType.setParseAction(lambda s, l, t: InstanceDef(t[0]))
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypInstance = pypStructMemberType + Optional(pypTypeParametrization)
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypStructVarType = pypStruct | pypEnum | pypSelect | pypInstance
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypStructVarTypeExtensions = ZeroOrMore(pypVectorOrSizeDef)
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypStructMemberName = get_pypUnqualifiedIdentifier('struct member name')
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypStructVarDef = Optional(pypStructVarQualifier) \
+                + pypStructVarType \
+                - Optional(pypStructMemberName) \
+                - pypStructVarTypeExtensions \
+                - pypLineTerm
+
+def parseStructVarDef(s, l, t):
+    i = (i for i, x in enumerate(t) if isinstance(x, TypeDef)).next()
+    var = t[i]
+    # assign member modifiers
+    if pypKeywordExtern in t[:i]:
+        var.setFlagExtern() 
+    if pypKeywordOptional in t[:i]:
+        var.setFlagOptional()
+    if pypKeywordDistinctive in t[:i]:
+        var.setFlagDistinctive()
+    # assign name if one has been given
+    if len(t) > i + 1 and isinstance(t[i + 1], str):
+        var.name = t[i + 1]
+    # apply vector, size, and fragment definitions
+    for e in t[i + 1:]:
+        if isinstance(e, WrapperDef):
+            var = e.embedElement(var)
+        elif isinstance(e, SizeDef):
+            var.setSize(e)
+    var.tplLineNo = getLineNumber(s, l)
+    return var
+
+pypStructVarDef.setParseAction(parseStructVarDef)
+
+
+# -----------------------------------------------------------------------------
+# EBNF: ... ;
+# -----------------------------------------------------------------------------
+pypStructVarDefs << ZeroOrMore(pypStructVarDef)
+
+
+#
+# _____________________________________________________________________________
+#
+def removeComments(text):
+    return '\n'.join(reduce(lambda x, y: x + y,
+        [pypLine.parseString(line).asList() for line in text.split('\n')]))
+
+
+#
+# _____________________________________________________________________________
+#
+def parseText(text):
+    """ Parse the eTPL source code <text> and return the list of (top-level)
+    definitions therein """
+    try:
+        return pypFile.parseString(text).asList()
+    except ParseBaseException as e:
+        raise EtplParseException(e)
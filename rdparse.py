@@ -0,0 +1,557 @@
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import re
+from core import *
+from parse import EtplParseException, LineIndex, getLineIndex
+
+
+#
+# _____________________________________________________________________________
+#
+# A recursive-descent parser for eTPL, as an alternative to the pyparsing
+# grammar in pypgrammar.py: the input is split into tokens using a single
+# regular expression, and the list of tokens is parsed by hand-written
+# functions following the grammar. The resulting IR is the same as the one built by the
+# pyparsing grammar, and syntax errors are reported at the same positions. As
+# the IR is built while parsing, an error raised building it (e.g. due to a
+# duplicate member name) may be reported where pyparsing reports a syntax
+# error following it within the same top-level definition.
+#
+
+reToken = re.compile(r'''
+    (?P<skip>[ \t\r\n]+|/\*(?:[^*]|\*(?!/))*\*/|//(?:\\\n|[^\n])*)
+  | (?P<hex>0[xX]\s*[0-9a-fA-F]*)
+  | (?P<bin>0[bB]\s*[01]*)
+  | (?P<dec>[0-9]+)
+  | (?P<name>[a-zA-Z][a-zA-Z0-9_]*)
+  | (?P<punct>\[\[|\]\]|<<|>>|::|\.\.|[{}()\[\]<>;,:=*^+-])
+  | (?P<invalid>.)
+''', re.VERBOSE | re.DOTALL)
+
+reservedWords = frozenset(['extern', 'optional', 'const', 'struct', 'enum',
+        'flags', 'select', 'case', 'default', 'bits', 'bytes'])
+
+qualifiers = frozenset(['extern', 'optional', 'distinctive'])
+
+# operator -> (precedence, right-associative, operation)
+intOperators = {
+    '^': (3, True, lambda x, y: x ** y),
+    '*': (2, False, lambda x, y: x * y),
+    '+': (1, False, lambda x, y: x + y),
+    '-': (0, False, lambda x, y: x - y)
+}
+
+
+class ParseError(Exception):
+    """
+    Syntax error at position <loc> in <pstr>. Errors that are not <fatal> may
+    be recovered from by trying an alternative (as is done for integer
+    expressions).
+    """
+
+    def __init__(self, pstr, loc, msg, fatal=True):
+        Exception.__init__(self, msg)
+        self.pstr = pstr
+        self.loc = loc
+        self.msg = msg
+        self.fatal = fatal
+
+    def __str__(self):
+        lineNo, col = getLineIndex(self.pstr).getLineAndColumn(self.loc)
+        return '{0} (at char {1}), (line:{2}, col:{3})'.format(
+                self.msg, self.loc, lineNo, col)
+
+
+#
+# _____________________________________________________________________________
+#
+def tokenize(text):
+    """ Split <text> into a list of tokens, each given as a tuple of its kind,
+    its value, and the positions of its first character and the one following
+    it. The kind of a punctuation token is the punctuation itself. Whitespace
+    and comments are dropped, and the list is terminated by an 'end' token. """
+    tokens = []
+    for match in reToken.finditer(text):
+        kind = match.lastgroup
+        if kind == 'skip':
+            continue
+        value = match.group()
+        if kind == 'punct':
+            kind = value
+        elif kind == 'hex' or kind == 'bin':
+            digits = value[2:].lstrip()
+            if digits:
+                value = int(digits, 16 if kind == 'hex' else 2)
+                kind = 'int'
+            else:
+                # (the prefix is only valid if followed by digits)
+                value = 'hex' if kind == 'hex' else 'binary'
+                kind = 'prefix'
+        elif kind == 'dec':
+            value = int(value)
+            kind = 'int'
+        tokens += [(kind, value, match.start(), match.end())]
+    tokens += [('end', None, len(text), len(text))]
+    return tokens
+
+
+def evaluate(tree):
+    if not isinstance(tree, tuple):
+        return tree
+    operation, lhs, rhs = tree
+    return operation(evaluate(lhs), evaluate(rhs))
+
+
+#
+# _____________________________________________________________________________
+#
+class Parser(object):
+    """
+    Recursive-descent parser for eTPL source code, with one parse*() method
+    per grammar element. A method returns None if the element is optional and
+    not found (and leaves the current token unchanged in that case).
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+        self.lineIndex = LineIndex(text)
+
+    def error(self, msg, fatal=True):
+        return ParseError(self.text, self.tokens[self.index][2], msg, fatal)
+
+    def accept(self, kind):
+        token = self.tokens[self.index]
+        if token[0] == kind:
+            self.index += 1
+            return True
+        if token[0] == kind * 2:
+            # only consume the first half of a double punctuation (e.g. "]"
+            # of "]]"), like the pyparsing grammar matching characters
+            self.tokens[self.index] = (kind, kind, token[2] + 1, token[3])
+            return True
+        return False
+
+    def expect(self, kind):
+        if not self.accept(kind):
+            raise self.error('Expected "{0}"'.format(kind))
+
+    def isKeyword(self, word):
+        token = self.tokens[self.index]
+        return token[0] == 'name' and token[1] == word
+
+    def acceptIdentifier(self):
+        token = self.tokens[self.index]
+        if token[0] == 'name' and token[1] not in reservedWords:
+            self.index += 1
+            return token[1]
+        return None
+
+    def expectIdentifier(self, what, afterWhitespace=False):
+        name = self.acceptIdentifier()
+        if name is None:
+            token = self.tokens[self.index]
+            if token[0] == 'name' and not afterWhitespace:
+                # the pyparsing grammar reports reserved words right after
+                # the preceding token, unless the whitespace in between has
+                # been skipped trying to match an optional element
+                loc = self.tokens[self.index - 1][3] if self.index else 0
+                raise ParseError(self.text, loc, 'Expected {0}'.format(what))
+            raise self.error('Expected {0}'.format(what))
+        return name
+
+    def getLineNumber(self, pos):
+        return self.lineIndex.getLineNumber(pos)
+
+    # _____ Integer expressions _____
+
+    def parseIntOperand(self, allowSymbols):
+        token = self.tokens[self.index]
+        kind = token[0]
+        if kind == '(':
+            self.index += 1
+            tree = self.parseIntTree(0, allowSymbols)
+            if self.tokens[self.index][0] != ')':
+                raise self.error('Expected ")"', False)
+            self.index += 1
+            return tree
+        if kind == 'int':
+            self.index += 1
+            return IntLiteral(token[1])
+        if kind == 'prefix':
+            # there is no way back once the prefix has been matched
+            raise ParseError(self.text, token[3],
+                    'Expected {0} digits'.format(token[1]))
+        if allowSymbols and kind == 'name' and token[1] not in reservedWords:
+            self.index += 1
+            return IntSymbol(token[1])
+        raise self.error('Expected integer expression', False)
+
+    def parseIntTree(self, minPrecedence, allowSymbols):
+        """ Returns the syntax tree of an integer expression made of operands
+        and (<operation>, <lhs>, <rhs>) tuples """
+        tree = self.parseIntOperand(allowSymbols)
+        while True:
+            operator = intOperators.get(self.tokens[self.index][0])
+            if operator is None or operator[0] < minPrecedence:
+                return tree
+            precedence, rightAssoc, operation = operator
+            index = self.index
+            self.index += 1
+            try:
+                rhs = self.parseIntTree(
+                        precedence if rightAssoc else precedence + 1,
+                        allowSymbols)
+            except ParseError:
+                # no valid operand following the operator: the expression
+                # ends right before the operator
+                self.index = index
+                return tree
+            tree = (operation, tree, rhs)
+
+    def parseIntExpr(self, allowSymbols=True):
+        return evaluate(self.parseIntTree(0, allowSymbols))
+
+    def parseOptionalIntExpr(self):
+        index = self.index
+        try:
+            return self.parseIntExpr()
+        except ParseError as e:
+            if e.fatal:
+                raise
+            self.index = index
+            return None
+
+    # _____ Top level _____
+
+    def parseFile(self):
+        typedefs = []
+        while self.tokens[self.index][0] != 'end':
+            if self.isKeyword('const'):
+                typedefs += [self.parseConstDef()]
+                continue
+            typedef = self.parseTypeDef()
+            if typedef is None:
+                raise self.error('Expected end of text')
+            typedefs += [typedef]
+        return typedefs
+
+    def parseConstDef(self):
+        self.index += 1
+        name = self.expectIdentifier('symbol name')
+        self.expect('=')
+        value = self.parseIntExpr()
+        self.expect(';')
+        return ConstDef(name, value)
+
+    def parseTypeDef(self):
+        token = self.tokens[self.index]
+        if token[0] != 'name':
+            return None
+        if token[1] == 'struct' or token[1] == 'enum':
+            try:
+                var = self.parseStruct() if token[1] == 'struct' \
+                        else self.parseEnum()
+            except ParseError:
+                # The pyparsing grammar tries the alternative types without
+                # committing to any of them, which is why errors within a
+                # top-level struct or enum are reported at the definition's
+                # start
+                raise ParseError(self.text, token[2], 'Expected end of text')
+        elif token[1] not in reservedWords:
+            self.index += 1
+            var = InstanceDef(token[1])
+            if self.tokens[self.index][0] == '::':
+                var.setArgs(self.parseTypeParametrization())
+        else:
+            return None
+        name = self.expectIdentifier('type name',
+                self.tokens[self.index - 1][0] == 'name')
+        extensions = self.parseTypeExtensions()
+        self.expect(';')
+        var.name = name
+        var = self.applyTypeExtensions(var, extensions)
+        var.tplLineNo = self.getLineNumber(token[2])
+        return var
+
+    # _____ Type extensions (vectors and sizes) _____
+
+    def parseTypeExtensions(self):
+        extensions = []
+        while True:
+            kind = self.tokens[self.index][0]
+            if kind == '[[' or kind == '[':
+                extensions += [self.parseVector()]
+            elif kind == '<<' or kind == '<':
+                extensions += [self.parseSelfContVector()]
+            elif kind == '(':
+                index = self.index
+                size = self.parseSizeDef()
+                if self.tokens[self.index][0] == '(' \
+                        and self.canParseSizeDef():
+                    # don't allow two size definitions follow each other
+                    self.index = index
+                    break
+                extensions += [size]
+            else:
+                break
+        return extensions
+
+    @staticmethod
+    def applyTypeExtensions(var, extensions):
+        for e in extensions:
+            if isinstance(e, WrapperDef):
+                var = e.embedElement(var)
+            elif isinstance(e, SizeDef):
+                var.setSize(e)
+        return var
+
+    def parseSizeUnitDef(self):
+        if self.isKeyword('bits'):
+            unit = SizeDef(None, 1)
+        elif self.isKeyword('bytes'):
+            unit = SizeDef(None, 8)
+        else:
+            raise self.error('Expected "bits" or "bytes"')
+        self.index += 1
+        return unit
+
+    def parseVector(self):
+        kind = self.tokens[self.index][0]
+        self.index += 1
+        vector = StaticVectorDef(isItemBased=(kind == '[['))
+        length = self.parseOptionalIntExpr()
+        if kind == '[':
+            if length is not None and self.accept(':'):
+                vector.lengthUnit = self.parseSizeUnitDef()
+            self.expect(']')
+        else:
+            self.expect(']]')
+        if length is not None:
+            vector.setLength(length)
+            if isinstance(length, IntSymbol):
+                vector.setBinding('length', length.getName())
+        return vector
+
+    def parseSelfContVector(self):
+        kind = self.tokens[self.index][0]
+        self.index += 1
+        vector = DynamicVectorDef(isItemBased=(kind == '<<'))
+        lengthMin = IntLiteral(0)
+        lengthMax = self.parseIntExpr()
+        if self.accept('..'):
+            lengthMin = lengthMax
+            lengthMax = self.parseIntExpr()
+        if kind == '<':
+            if self.accept(':'):
+                vector.lengthUnit = self.parseSizeUnitDef()
+            self.expect('>')
+        else:
+            self.expect('>>')
+        vector.lengthMin = lengthMin
+        vector.lengthMax = lengthMax
+        return vector
+
+    def parseSizeDef(self):
+        self.index += 1
+        size = self.parseIntExpr()
+        unit = self.parseSizeUnitDef() if self.accept(':') else None
+        self.expect(')')
+        if unit is not None:
+            unit.setSize(size)
+            return unit
+        return SizeDef(size)
+
+    def canParseSizeDef(self):
+        index = self.index
+        tokens = self.tokens[:]
+        try:
+            self.parseSizeDef()
+            return True
+        except ParseError:
+            return False
+        finally:
+            self.index = index
+            self.tokens = tokens
+
+    # _____ Type parametrization _____
+
+    def parseTypeParametrization(self):
+        self.index += 1
+        # errors in the list of parameters are never recovered from
+        try:
+            self.expect('<')
+            choices = [self.parseTypeParameterChoice()]
+            while self.accept(','):
+                choices += [self.parseTypeParameterChoice()]
+            self.expect('>')
+        except ParseError as e:
+            raise EtplParseException(e)
+        return reduce(InstanceDef.mergeArgsDisjunct, choices)
+
+    def parseTypeParameterChoice(self):
+        name = self.expectIdentifier('parameter name')
+        self.expect('=')
+        index = self.index
+        try:
+            value = self.parseIntExpr()
+        except ParseError as e:
+            token = self.tokens[index]
+            if e.fatal or token[0] != 'name':
+                raise ParseError(self.text, e.loc, 'Expected parameter value')
+            # any word (including reserved ones) is a valid value as well
+            self.index = index + 1
+            value = token[1]
+        return {name: value}
+
+    # _____ Structs, enums, and selects _____
+
+    def parseStruct(self):
+        self.index += 1
+        self.expect('{')
+        members = self.parseStructVarDefs()
+        self.expect('}')
+        return StructDef(members)
+
+    def parseStructVarDefs(self):
+        members = []
+        while True:
+            member = self.parseStructVarDef()
+            if member is None:
+                return members
+            members += [member]
+
+    def parseStructVarDef(self):
+        start = self.index
+        token = self.tokens[start]
+        qualifier = None
+        if token[0] == 'name' and token[1] in qualifiers:
+            qualifier = token[1]
+            self.index += 1
+        args = None
+        if self.isKeyword('struct'):
+            var = self.parseStruct()
+        elif self.isKeyword('enum'):
+            var = self.parseEnum()
+        elif self.isKeyword('select'):
+            var = self.parseSelect()
+        else:
+            typename = self.acceptIdentifier()
+            if typename is None:
+                self.index = start
+                return None
+            var = InstanceDef(typename)
+            if self.tokens[self.index][0] == '::':
+                args = self.parseTypeParametrization()
+        name = self.acceptIdentifier()
+        extensions = self.parseTypeExtensions()
+        self.expect(';')
+        if qualifier == 'extern':
+            var.setFlagExtern()
+        elif qualifier == 'optional':
+            var.setFlagOptional()
+        elif qualifier == 'distinctive':
+            var.setFlagDistinctive()
+        # (like the pyparsing grammar, drop the member's name if the type is
+        # parametrized)
+        if name is not None and args is None:
+            var.name = name
+        var = self.applyTypeExtensions(var, extensions)
+        var.tplLineNo = self.getLineNumber(token[2])
+        return var
+
+    def parseEnum(self):
+        self.index += 1
+        self.expect('{')
+        items = [self.parseEnumItem()]
+        while self.accept(','):
+            items += [self.parseEnumItem()]
+        self.expect('}')
+        return EnumDef(items)
+
+    def parseEnumItem(self):
+        # errors in enumeration items are never recovered from
+        try:
+            name = self.acceptIdentifier()
+            self.expect('(')
+            isFallback = self.accept('*')
+            if not isFallback:
+                minCode = maxCode = self.parseIntExpr(False)
+                if self.accept('..'):
+                    maxCode = self.parseIntExpr(False)
+            self.expect(')')
+        except ParseError as e:
+            raise EtplParseException(e)
+        if isFallback:
+            return EnumItemFallback(name)
+        return EnumItem(name, minCode, maxCode)
+
+    def parseSelect(self):
+        self.index += 1
+        self.expect('(')
+        testSymbol = self.expectIdentifier('variant selector')
+        self.expect(')')
+        self.expect('{')
+        cases = []
+        while self.isKeyword('case'):
+            self.index += 1
+            cond = [self.expectIdentifier('identifier')]
+            while self.tokens[self.index][0] == ',':
+                token = self.tokens[self.index + 1]
+                if token[0] != 'name' or token[1] in reservedWords:
+                    break
+                cond += [token[1]]
+                self.index += 2
+            self.expect(':')
+            cases += [CaseDef(cond, self.parseStructVarDefs())]
+        if self.isKeyword('default'):
+            self.index += 1
+            self.expect(':')
+            cases += [DefaultCaseDef(self.parseStructVarDefs())]
+        self.expect('}')
+        return SelectDef(testSymbol, cases)
+
+
+#
+# _____________________________________________________________________________
+#
+def parseText(text):
+    """ Parse the eTPL source code <text> and return the list of (top-level)
+    definitions therein """
+    try:
+        return Parser(text).parseFile()
+    except ParseError as e:
+        raise EtplParseException(e)
@@ -0,0 +1,231 @@
+# Copyright (C) 2017
+# Andreas Walz [andreas.walz@hs-offenburg.de]
+# Offenburg University of Applied Sciences
+# Institute of Reliable Embedded Systems and Communications Electronics (ivESK)
+# [https://ivesk.hs-offenburg.de/]
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+#
+# Snapshots of (normalized, sorted, and checked) type definition collections,
+# allowing code generators to start over without parsing and normalizing the
+# original eTPL input again.
+#
+# A snapshot file starts with a magic string, followed by the format version
+# and the collection's encoding stored as JSON. The encoding only consists of
+# built-in Python types: each IR node is encoded as a tuple of its class name
+# and its attributes. Parent relations are implicit, cached data is omitted,
+# and both are restored when loading the snapshot. As snapshots (and cached
+# data) may come from untrusted sources, decoding only ever instantiates IR
+# node classes and only sets their (non-cache) attributes.
+#
+
+import json
+from core import *
+
+
+SNAPSHOT_MAGIC = 'eTPL-snapshot\n'
+SNAPSHOT_VERSION = 1
+
+# Attributes of IR nodes that are not stored in snapshots
+ignoredAttributes = cacheAttributes | generatorAttributes | frozenset(['parent'])
+
+
+class SnapshotError(TPLError):
+    pass
+
+
+#
+# _____________________________________________________________________________
+#
+
+def getNodeClasses():
+    """ Return a dictionary of all IR node classes by their names """
+    classes = {}
+    pending = [TypeDef, SizeDef, IntElement, EnumItemAbstract]
+    while pending:
+        cls = pending.pop()
+        classes[cls.__name__] = cls
+        pending += cls.__subclasses__()
+    return classes
+
+
+# Per class: the list of all its (and its base classes') attributes
+classSlots = {}
+
+def getSlots(cls):
+    slots = classSlots.get(cls)
+    if slots is None:
+        slots = []
+        for c in reversed(cls.__mro__):
+            slots += [a for a in c.__dict__.get('__slots__', ()) \
+                    if a not in slots]
+        classSlots[cls] = slots
+    return slots
+
+
+def encode(obj):
+    if isinstance(obj, (TypeDef, SizeDef, IntElement, EnumItemAbstract)):
+        attrs = [(attr, encode(getattr(obj, attr))) \
+                for attr in getSlots(obj.__class__) \
+                        if attr not in ignoredAttributes and hasattr(obj, attr)]
+        return ('o', obj.__class__.__name__, attrs)
+    elif isinstance(obj, list):
+        return ('l', [encode(v) for v in obj])
+    elif isinstance(obj, tuple):
+        return ('t', [encode(v) for v in obj])
+    elif isinstance(obj, dict):
+        return ('d', [(encode(k), encode(v)) for k, v in obj.iteritems()])
+    elif isinstance(obj, (set, frozenset)):
+        return ('s', [encode(v) for v in obj])
+    elif isinstance(obj, unicode):
+        return ('u', obj)
+    elif obj is None or isinstance(obj, (str, bool, int, long, float)):
+        return ('v', obj)
+    else:
+        raise SnapshotError('Cannot store object of type "{0}" in snapshot' \
+                .format(type(obj).__name__))
+
+
+def decode(data, classes):
+    """ Return the object encoded by <data>, raising SnapshotError if <data>
+    is not a valid encoding """
+    if not isinstance(data, (list, tuple)) or not data:
+        raise SnapshotError('Invalid snapshot data')
+    tag = data[0]
+    if tag == 'v':
+        value = data[1]
+        if isinstance(value, unicode):
+            # JSON turns all strings into unicode strings (see dumpEncoding())
+            return value.encode('latin-1')
+        elif value is not None and \
+                not isinstance(value, (str, bool, int, long, float)):
+            raise SnapshotError('Invalid snapshot data')
+        return value
+    elif tag == 'u':
+        if not isinstance(data[1], unicode):
+            raise SnapshotError('Invalid snapshot data')
+        return data[1]
+    elif tag == 'l':
+        return [decode(v, classes) for v in data[1]]
+    elif tag == 't':
+        return tuple([decode(v, classes) for v in data[1]])
+    elif tag == 'd':
+        return dict([(decode(k, classes), decode(v, classes)) \
+                for k, v in data[1]])
+    elif tag == 's':
+        return set([decode(v, classes) for v in data[1]])
+    elif tag == 'o':
+        cls = classes.get(data[1])
+        if cls is None:
+            raise SnapshotError('Unknown node class "{0}" in snapshot' \
+                    .format(data[1]))
+        # bypass the constructor: all attributes are restored from the data
+        obj = cls.__new__(cls)
+        slots = getSlots(cls)
+        for attr in slots:
+            if attr in cacheAttributes:
+                setattr(obj, attr, None)
+        for attr, value in data[2]:
+            if attr not in slots or attr in ignoredAttributes:
+                raise SnapshotError('Invalid attribute "{0}" of node class ' \
+                        '"{1}" in snapshot'.format(attr, data[1]))
+            setattr(obj, str(attr), decode(value, classes))
+        if isinstance(obj, TypeDef):
+            obj.parent = None
+            for child in obj.getChildren():
+                child.parent = obj
+        return obj
+    else:
+        raise SnapshotError('Invalid snapshot data')
+
+
+def dumpEncoding(data):
+    """ Return the JSON text of the encoding <data> """
+    # (Python strings are byte strings and are taken as Latin-1 to make them
+    # survive the round trip through JSON whatever their content)
+    return json.dumps(data, separators=(',', ':'), encoding='latin-1')
+
+
+def loadEncoding(text):
+    """ Return the encoding stored as JSON text <text> """
+    return json.loads(text)
+
+
+#
+# _____________________________________________________________________________
+#
+
+def isSnapshotFile(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+def encodeSnapshot(typedefs):
+    """ Return the snapshot of the type definition collection <typedefs> """
+    data = (SNAPSHOT_VERSION, list(typedefs.getGlobalSymbols()),
+            [encode(t) for t in typedefs.getTypeDefs()])
+    return SNAPSHOT_MAGIC + dumpEncoding(data)
+
+
+def decodeSnapshot(snapshot, name='<snapshot>'):
+    """ Return the type definition collection stored in <snapshot> """
+    if not snapshot.startswith(SNAPSHOT_MAGIC):
+        raise SnapshotError('"{0}" is not a snapshot'.format(name))
+    try:
+        data = loadEncoding(snapshot[len(SNAPSHOT_MAGIC):])
+    except ValueError:
+        raise SnapshotError('Corrupt snapshot "{0}"'.format(name))
+    if not isinstance(data, list) or not data or data[0] != SNAPSHOT_VERSION:
+        raise SnapshotError('Unsupported snapshot version in "{0}"' \
+                .format(name))
+    classes = getNodeClasses()
+    try:
+        typedefs = TypeDefCollection(
+                set([s.encode('latin-1') for s in data[1]]))
+        typedefs.addDefs([decode(t, classes) for t in data[2]])
+    except SnapshotError:
+        raise
+    except Exception:
+        raise SnapshotError('Corrupt snapshot "{0}"'.format(name))
+    return typedefs
+
+
+def saveSnapshot(typedefs, filename):
+    """ Write the type definition collection <typedefs> to a snapshot file """
+    with open(filename, 'wb') as f:
+        f.write(encodeSnapshot(typedefs))
+
+
+def loadSnapshot(filename):
+    """ Read a type definition collection from a snapshot file """
+    with open(filename, 'rb') as f:
+        return decodeSnapshot(f.read(), filename)
+
+TypeDefCollection.saveSnapshot = saveSnapshot